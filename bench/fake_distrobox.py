@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Stand-in for distrobox, distrobox-export and podman, so BoxBuddy can be
+benchmarked without real containers. Which tool it acts as comes from the
+name it's run as. Configured through the environment:
+
+BENCH_DIR         where run_benchmarks.py generated the boxes' applications
+BENCH_BOXES       how many boxes exist
+BENCH_LATENCY_MS  how long every call sleeps before answering
+BENCH_LIST_FORMAT "1.4" or "1.5", the `distrobox list` table to print
+BENCH_ENGINE      "podman" for a working engine, "none" for one which fails
+"""
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import time
+
+IMAGES = (
+    "docker.io/library/ubuntu:22.04",
+    "registry.fedoraproject.org/fedora-toolbox:38",
+    "docker.io/library/archlinux:latest",
+    "docker.io/library/debian:12",
+    "docker.io/library/alpine:latest",
+    "quay.io/toolbx-images/rockylinux-toolbox:9",
+)
+
+DISTROS = (
+    "alma",
+    "alpine",
+    "amazon",
+    "arch",
+    "centos",
+    "clearlinux",
+    "debian",
+    "fedora",
+    "gentoo",
+    "kali",
+    "opensuse",
+    "rocky",
+    "slackware",
+    "ubuntu",
+    "void",
+)
+
+
+def get_boxes() -> list[dict[str, str]]:
+    boxes = []
+    for index in range(int(os.getenv("BENCH_BOXES", "10"))):
+        name = f"bench-box-{index:03d}"
+        boxes.append(
+            {
+                "name": name,
+                "id": hashlib.sha256(name.encode()).hexdigest(),
+                "image": IMAGES[index % len(IMAGES)],
+                "status": "Up 2 hours" if index % 2 else "Exited (0) 3 days ago",
+            }
+        )
+
+    return boxes
+
+
+def get_box(name_or_id: str) -> dict[str, str]:
+    for box in get_boxes():
+        if name_or_id in (box["name"], box["id"], box["id"][:12]):
+            return box
+
+    sys.exit(f"Error: no such container {name_or_id}")
+
+
+def get_apps_dir(box_name: str) -> str:
+    return os.path.join(os.environ["BENCH_DIR"], "boxes", box_name, "applications")
+
+
+def distrobox(args: list[str]):
+    action = args[0] if args else ""
+
+    if action == "version":
+        version = "1.4.2.1" if os.getenv("BENCH_LIST_FORMAT") == "1.4" else "1.5.0.2"
+        print(f"distrobox: {version}")
+
+    elif action == "list":
+        if os.getenv("BENCH_LIST_FORMAT") == "1.4":
+            print(f"{'ID':<12} | {'NAME':<20} | {'STATUS':<25} | IMAGE")
+            for box in get_boxes():
+                print(
+                    f"{box['id'][:12]} | {box['name']:<20} | "
+                    f"{box['status']:<25} | {box['image']}"
+                )
+        else:
+            print(f"{'ID':<12} | {'NAME':<20} | {'STATUS':<25} | {'MEMORY':<8} | IMAGE")
+            for box in get_boxes():
+                print(
+                    f"{box['id'][:12]} | {box['name']:<20} | "
+                    f"{box['status']:<25} | {'12MB':<8} | {box['image']}"
+                )
+
+    elif action == "create" and "-C" in args:
+        print("Images")
+        for distro in DISTROS:
+            for tag in ("latest", "stable", "edge", "rolling"):
+                print(f"quay.io/toolbx-images/{distro}-toolbox:{tag}")
+
+    elif action == "enter":
+        box_name = args[1]
+        get_box(box_name)
+
+        # run the command on the host, with the box's applications dir
+        command = args[args.index("--") + 1 :] if "--" in args else ["true"]
+        command = [
+            get_apps_dir(box_name) if arg == "/usr/share/applications" else arg
+            for arg in command
+        ]
+
+        if command == ["sh"] and not sys.stdin.isatty():
+            return run_session_shell(box_name)
+
+        sys.stdout.flush()
+        os.execvp(command[0], command)
+
+    else:
+        print(f"{action}: done")
+
+
+def run_session_shell(box_name: str):
+    """
+    Forwards commands piped into the box's shell, pointing them at the
+    box's applications dir
+    """
+    shell = subprocess.Popen(["sh"], stdin=subprocess.PIPE)
+    for line in sys.stdin.buffer:
+        line = line.replace(b"/usr/share/applications", get_apps_dir(box_name).encode())
+        shell.stdin.write(line)
+        shell.stdin.flush()
+
+    shell.stdin.close()
+    shell.wait()
+
+
+def distrobox_export(args: list[str]):
+    app = args[args.index("-a") + 1] if "-a" in args else ""
+    print(f"Application {app} successfully exported.")
+
+
+def podman(args: list[str]):
+    if os.getenv("BENCH_ENGINE") == "none":
+        sys.exit("Error: cannot connect to the engine")
+
+    action = args[0] if args else ""
+
+    if action == "ps":
+        print(
+            json.dumps(
+                [
+                    {
+                        "Id": box["id"],
+                        "Names": [box["name"]],
+                        "Image": box["image"],
+                        "Status": box["status"],
+                        "State": "exited" if "Exited" in box["status"] else "running",
+                    }
+                    for box in get_boxes()
+                ]
+            )
+        )
+
+    elif action == "cp":
+        container, path = args[1].split(":", 1)
+        box = get_box(container)
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(get_apps_dir(box["name"]), arcname=os.path.basename(path))
+
+        sys.stdout.buffer.write(buffer.getvalue())
+
+    elif action == "stats":
+        ids = [arg for arg in args[1:] if not arg.startswith("-") and arg != "json"]
+        print(
+            json.dumps(
+                [
+                    {
+                        "id": get_box(container_id)["id"],
+                        "cpu_percent": "1.25%",
+                        "mem_usage": "120.5MB / 16GB",
+                        "mem_percent": "0.75%",
+                        "block_io": "12.1MB / 4.2MB",
+                        "pids": "7",
+                    }
+                    for container_id in ids
+                ]
+            )
+        )
+
+    elif action == "top":
+        print("COMMAND\nentrypoint\nsleep")
+
+    elif action == "events":
+        while True:
+            time.sleep(3600)
+
+
+def main():
+    time.sleep(int(os.getenv("BENCH_LATENCY_MS", "0")) / 1000)
+
+    tool = os.path.basename(sys.argv[0])
+    tools = {
+        "distrobox": distrobox,
+        "distrobox-export": distrobox_export,
+        "podman": podman,
+    }
+    tools.get(tool, distrobox)(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Times BoxBuddy's box, app and image listing against the stand-ins in
+fake_distrobox.py, so scaling regressions show up as numbers. e.g.
+
+    python3 bench/run_benchmarks.py --boxes 10 100 --apps 50 500 --latency 20 \\
+        | tee bench_output.txt
+
+Each scenario runs in its own process, with the stand-ins first on PATH and
+empty XDG cache and config dirs. "cold" runs start with an empty BoxBuddy
+cache, "warm" runs reuse what the previous run cached. The GTK timings are
+skipped when gi is missing or there is no display.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+FAKE_TOOLS = ("distrobox", "distrobox-export", "podman")
+
+
+def make_fake_host(work_dir: str, apps: int) -> str:
+    """
+    Puts the stand-ins in a bin dir, and writes the first box's .desktop
+    files, which are the ones the app listing is timed against
+    """
+    bin_dir = os.path.join(work_dir, "bin")
+    os.makedirs(bin_dir)
+    for tool in FAKE_TOOLS:
+        os.symlink(
+            os.path.join(BENCH_DIR, "fake_distrobox.py"), os.path.join(bin_dir, tool)
+        )
+
+    apps_dir = os.path.join(work_dir, "boxes", "bench-box-000", "applications")
+    os.makedirs(apps_dir)
+    for index in range(apps):
+        with open(os.path.join(apps_dir, f"bench-app-{index}.desktop"), "w") as f:
+            f.write(
+                "[Desktop Entry]\n"
+                "Type=Application\n"
+                f"Name=Bench App {index}\n"
+                f"Name[de]=Bench Anwendung {index}\n"
+                f"Exec=bench-app-{index} %U\n"
+                f"Icon=bench-app-{index}\n"
+                f"NoDisplay={'true' if index % 10 == 9 else 'false'}\n"
+            )
+
+    return bin_dir
+
+
+def run_scenario(
+    args, boxes: int, apps: int, list_format: str, engine: str, sessions: str
+):
+    work_dir = tempfile.mkdtemp(prefix="boxbuddy-bench-")
+
+    try:
+        bin_dir = make_fake_host(work_dir, apps)
+
+        settings_dir = os.path.join(work_dir, "config", "boxbuddy")
+        os.makedirs(settings_dir)
+        with open(os.path.join(settings_dir, "settings.json"), "w") as f:
+            json.dump({"exec_sessions": sessions == "on"}, f)
+
+        env = dict(os.environ)
+        env.update(
+            {
+                "PATH": f"{bin_dir}{os.pathsep}{env.get('PATH', '')}",
+                "XDG_CACHE_HOME": os.path.join(work_dir, "cache"),
+                "XDG_CONFIG_HOME": os.path.join(work_dir, "config"),
+                "XDG_DATA_HOME": os.path.join(work_dir, "data"),
+                "DBX_CONTAINER_MANAGER": "podman",
+                "BENCH_DIR": work_dir,
+                "BENCH_BOXES": str(boxes),
+                "BENCH_LATENCY_MS": str(args.latency),
+                "BENCH_LIST_FORMAT": list_format,
+                "BENCH_ENGINE": engine,
+            }
+        )
+        env.pop("FLATPAK_ID", None)
+
+        worker = subprocess.run(
+            [sys.executable, __file__, "--worker", "--repeat", str(args.repeat)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"boxes={boxes} apps={apps} latency={args.latency}ms "
+        f"list={list_format} engine={engine} sessions={sessions}"
+    )
+
+    if worker.returncode != 0:
+        print(f"  failed:\n{worker.stderr}")
+        return
+
+    for result in json.loads(worker.stdout):
+        if "skipped" in result:
+            print(f"  {result['name']:<44} skipped: {result['skipped']}")
+            continue
+
+        print(
+            f"  {result['name']:<44} {result['median_ms']:9.1f} ms"
+            f"  (min {result['min_ms']:.1f}, {result['runs']} runs,"
+            f" {result['commands']} commands per run)"
+            + (f"  {result['items']} items" if result["items"] is not None else "")
+        )
+
+    print()
+
+
+def run_worker(repeat: int):
+    """
+    Runs inside the scenario's environment, printing results as json
+    """
+    sys.path.insert(0, SRC_DIR)
+
+    import distrobox_handler
+    import host_info
+    import tracing
+    from cache import get_cache_dir
+
+    results = []
+    commands = []
+    tracing.listeners.append(commands.append)
+
+    def clear_cache():
+        shutil.rmtree(get_cache_dir(), ignore_errors=True)
+
+    def measure(name, func, runs=repeat, reset=None):
+        times = []
+        result = None
+        commands_before = len(commands)
+
+        for run in range(runs):
+            if reset:
+                reset()
+
+            start = time.perf_counter()
+            result = func()
+            times.append((time.perf_counter() - start) * 1000)
+
+        results.append(
+            {
+                "name": name,
+                "median_ms": statistics.median(times),
+                "min_ms": min(times),
+                "runs": runs,
+                "commands": (len(commands) - commands_before) // runs,
+                "items": len(result) if isinstance(result, (list, dict)) else None,
+            }
+        )
+
+        return result
+
+    measure("probe host (cold)", host_info.refresh_host_info, reset=clear_cache)
+
+    boxes = measure("get_all_distroboxes", distrobox_handler.get_all_distroboxes)
+    first_box = boxes[0] if boxes else None
+
+    if first_box:
+        get_first_box_apps = lambda: distrobox_handler.get_apps_in_box(
+            first_box.name, first_box.container_id
+        )
+        measure("get_apps_in_box (cold)", get_first_box_apps, reset=clear_cache)
+        apps = measure("get_apps_in_box (warm)", get_first_box_apps)
+    else:
+        apps = []
+
+    get_images = distrobox_handler.get_available_images_with_distro_name
+    measure(
+        "get_available_images_with_distro_name (cold)", get_images, reset=clear_cache
+    )
+    measure("get_available_images_with_distro_name (warm)", get_images)
+
+    results.extend(run_gtk_benchmarks(measure, boxes, apps, first_box))
+
+    print(json.dumps(results))
+
+
+def run_gtk_benchmarks(measure, boxes, apps, first_box) -> list[dict]:
+    names = ("load_boxes", "on_boxes_loaded", "on_list_local_apps_called")
+
+    try:
+        import gi
+
+        gi.require_version("Gtk", "4.0")
+        gi.require_version("Adw", "1")
+        from gi.repository import Adw, GLib, Gtk
+    except (ImportError, ValueError):
+        return [{"name": name, "skipped": "gi is not installed"} for name in names]
+
+    if not Gtk.init_check():
+        return [{"name": name, "skipped": "no display"} for name in names]
+
+    Adw.init()
+
+    from main_window import MainWindow
+
+    # the window is never shown, so its startup work never runs
+    window = MainWindow()
+
+    def load_boxes():
+        loaded = []
+        on_boxes_loaded = window.on_boxes_loaded
+
+        def on_loaded(*args, **kwargs):
+            on_boxes_loaded(*args, **kwargs)
+            loaded.append(True)
+
+        window.on_boxes_loaded = on_loaded
+        window.load_boxes()
+        while not loaded:
+            GLib.MainContext.default().iteration(True)
+
+        del window.on_boxes_loaded
+
+    measure("load_boxes (first render)", load_boxes, runs=1)
+    measure("load_boxes (re-render)", load_boxes)
+    measure("on_boxes_loaded (re-render)", lambda: window.on_boxes_loaded(boxes))
+
+    if first_box:
+        window.show_box_applications(first_box.name, first_box.container_id)
+        measure(
+            "on_list_local_apps_called",
+            lambda: window.on_list_local_apps_called(apps, first_box.name),
+        )
+        window.show_apps_popup.destroy()
+
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--apps", type=int, nargs="+", default=[50, 500])
+    parser.add_argument(
+        "--latency", type=int, default=0, help="ms every fake command sleeps"
+    )
+    parser.add_argument(
+        "--list-format", nargs="+", default=["1.4", "1.5"], choices=["1.4", "1.5"]
+    )
+    parser.add_argument(
+        "--engine",
+        nargs="+",
+        default=["podman", "none"],
+        choices=["podman", "none"],
+        help="none makes podman fail, to time the distrobox-only fallbacks",
+    )
+    parser.add_argument(
+        "--sessions",
+        nargs="+",
+        default=["off"],
+        choices=["off", "on"],
+        help="whether commands in boxes go through a reused shell session",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.repeat)
+
+    for boxes, apps, list_format, engine, sessions in itertools.product(
+        args.boxes, args.apps, args.list_format, args.engine, args.sessions
+    ):
+        run_scenario(args, boxes, apps, list_format, engine, sessions)
+
+
+if __name__ == "__main__":
+    main()
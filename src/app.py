@@ -1,12 +1,20 @@
 import sys
+
+# imported first so its clock starts before anything heavy is loaded
+import startup_timing
+
 import gi
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 from gi.repository import Adw
 
+startup_timing.mark("gi loaded")
+
 from main_window import MainWindow
 
+startup_timing.mark("main window imported")
+
 
 class MyApp(Adw.Application):
     def __init__(self, **kwargs):
@@ -15,6 +23,8 @@ class MyApp(Adw.Application):
 
     def on_activate(self, app):
         self.win = MainWindow(application=app)
+        startup_timing.mark("window shell built")
+
         self.win.present()
 
 
@@ -1,10 +1,68 @@
-#!/usr/bin/env bash
-grep -L "NoDisplay=true" /usr/share/applications/*.desktop | while read line
-do
-    NAME=$(grep -m 1 "^Name=" $line | sed 's/Name=//' | tr -d '\n')
-    EXEC=$(grep -m 1 "^Exec=" $line | sed 's/Exec=//' | tr -d '\n')
-    ICON=$(grep -m 1 "^Icon=" $line | sed 's/Icon=//' | tr -d '\n')
-    LINESTRIPPED=$(echo $line | sed 's/\/usr\/share\/applications\///g' | sed 's/\.desktop//g');
-
-    echo "${LINESTRIPPED};${ICON};${NAME};${EXEC}"
-done
+#!/bin/sh
+# Prints a fingerprint of the applications dir, then, unless it matches the
+# known fingerprint passed as $2, the [Desktop Entry] keys BoxBuddy needs
+# from every .desktop file as one json object per line, parsing all of them
+# in a single awk process.
+APPS_DIR="${1:-/usr/share/applications}"
+KNOWN_FINGERPRINT="$2"
+
+set -- "$APPS_DIR"/*.desktop
+COUNT=0
+[ -e "$1" ] && COUNT=$#
+
+FINGERPRINT="$(stat -c %Y "$APPS_DIR" 2>/dev/null):${COUNT}"
+echo "{\"fingerprint\":\"${FINGERPRINT}\"}"
+
+[ "$FINGERPRINT" = "$KNOWN_FINGERPRINT" ] && exit 0
+[ "$COUNT" -gt 0 ] || exit 0
+
+exec awk '
+function esc(s,    parts, n, i, out) {
+    n = split(s, parts, /\\/)
+    out = parts[1]
+    for (i = 2; i <= n; i++) out = out "\\\\" parts[i]
+    s = out
+
+    n = split(s, parts, /"/)
+    out = parts[1]
+    for (i = 2; i <= n; i++) out = out "\\\"" parts[i]
+    s = out
+
+    gsub(/[\t\r]/, " ", s)
+    return s
+}
+
+function flush() {
+    if (file != "") print "{\"file\":\"" esc(file) "\"" fields "}"
+}
+
+FNR == 1 {
+    flush()
+    file = FILENAME
+    fields = ""
+    in_entry = 0
+    delete seen
+}
+
+/^\[/ {
+    in_entry = ($0 ~ /^\[Desktop Entry\][ \t\r]*$/)
+    next
+}
+
+in_entry && /^(Name|Name\[[^]]*\]|Exec|Icon|NoDisplay|Hidden|Type)[ \t]*=/ {
+    eq = index($0, "=")
+    key = substr($0, 1, eq - 1)
+    sub(/[ \t]+$/, "", key)
+
+    if (key in seen) next
+    seen[key] = 1
+
+    value = substr($0, eq + 1)
+    sub(/^[ \t]+/, "", value)
+    sub(/[ \t\r]+$/, "", value)
+
+    fields = fields ",\"" esc(key) "\":\"" esc(value) "\""
+}
+
+END { flush() }
+' "$@"
@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+from typing import Any
+
+
+def get_cache_dir(*parts: str) -> str:
+    """
+    Gets (and creates) BoxBuddy's directory under XDG_CACHE_HOME
+    """
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    cache_dir = os.path.join(base, "boxbuddy", *parts)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return cache_dir
+
+
+def get_cache_path(name: str, *parts: str) -> str:
+    return os.path.join(get_cache_dir(*parts), name)
+
+
+def read_json_cache(name: str, *parts: str) -> Any:
+    """
+    Reads a cached json file, returning None if missing or unreadable
+    """
+    try:
+        with open(get_cache_path(name, *parts), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_cache(name: str, data: Any, *parts: str):
+    """
+    Atomically writes data to a cached json file
+    """
+    path = get_cache_path(name, *parts)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def remove_cache(name: str, *parts: str):
+    try:
+        os.remove(get_cache_path(name, *parts))
+    except OSError:
+        pass
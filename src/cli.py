@@ -0,0 +1,191 @@
+"""
+Headless BoxBuddy, for scripts and cron jobs. Prints JSON and never
+imports gi, so e.g. `boxbuddy-cli list` returns as fast as the engine does.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from dataclasses import asdict
+from typing import Any, Callable
+
+from distrobox_handler import (
+    create_box,
+    export_apps_from_box,
+    export_box_image,
+    get_all_distroboxes,
+    get_apps_in_box,
+    get_available_images_with_distro_name,
+    init_new_box,
+    remove_box,
+    stop_box,
+    upgrade_box_headless,
+)
+from jobs import BatchResult, JobScheduler
+
+
+def print_json(data: Any):
+    json.dump(data, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def command_result(command) -> dict[str, Any]:
+    return {
+        "succeeded": command.succeeded,
+        "returncode": command.returncode,
+        "stdout": command.stdout,
+        "stderr": command.stderr,
+    }
+
+
+def run_batch(
+    title: str, func: Callable, box_names: list[str], parallel: int
+) -> list[BatchResult]:
+    """
+    Runs func over every box, `parallel` at a time, and waits for all of them
+    """
+    if not box_names:
+        return []
+
+    finished = threading.Event()
+    scheduler = JobScheduler(max_workers=parallel)
+    batch = scheduler.submit_batch(
+        title,
+        func,
+        box_names,
+        parallel,
+        on_finished=lambda batch: finished.set(),
+    )
+    finished.wait()
+
+    return sorted(batch.results, key=lambda result: box_names.index(result.box_name))
+
+
+def list_boxes(args) -> int:
+    print_json([asdict(box) for box in get_all_distroboxes()])
+
+    return 0
+
+
+def list_apps(args) -> int:
+    container_ids = {box.name: box.container_id for box in get_all_distroboxes()}
+    if args.box not in container_ids:
+        print_json({"error": f"No box called {args.box}"})
+        return 1
+
+    apps = get_apps_in_box(args.box, container_ids[args.box])
+    print_json([asdict(app) for app in apps])
+
+    return 0
+
+
+def list_images(args) -> int:
+    print_json(get_available_images_with_distro_name())
+
+    return 0
+
+
+def create(args) -> int:
+    command = create_box(args.name, args.image)
+    result = {"create": command_result(command)}
+
+    if command.succeeded and args.init:
+        result["init"] = command_result(init_new_box(args.name))
+
+    print_json(result)
+
+    return 0 if all(step["succeeded"] for step in result.values()) else 1
+
+
+def export_apps(args) -> int:
+    results = export_apps_from_box(args.box, args.apps)
+    print_json([asdict(result) for result in results])
+
+    return 0 if all(result.succeeded for result in results) else 1
+
+
+def run_box_action(args) -> int:
+    boxes = get_all_distroboxes()
+    container_ids = {box.name: box.container_id for box in boxes}
+
+    box_names = [box.name for box in boxes] if args.all else args.boxes
+    unknown = [name for name in box_names if name not in container_ids]
+    if unknown:
+        print_json({"error": f"No box called {', '.join(unknown)}"})
+        return 1
+
+    actions: dict[str, tuple[str, Callable]] = {
+        "upgrade": ("Upgrade", upgrade_box_headless),
+        "stop": ("Stop", stop_box),
+        "export-image": ("Export", export_box_image),
+        "delete": ("Delete", lambda name: remove_box(name, container_ids[name])),
+    }
+    title, func = actions[args.action]
+
+    results = run_batch(title, func, box_names, args.parallel)
+    print_json([asdict(result) for result in results])
+
+    return 0 if all(result.succeeded for result in results) else 1
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="boxbuddy-cli", description="Manage your Distroboxes, with JSON output"
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    subparsers.add_parser("list", help="list boxes").set_defaults(func=list_boxes)
+
+    apps_parser = subparsers.add_parser("apps", help="list applications in a box")
+    apps_parser.add_argument("box")
+    apps_parser.set_defaults(func=list_apps)
+
+    images_parser = subparsers.add_parser("images", help="list images to create from")
+    images_parser.set_defaults(func=list_images)
+
+    create_parser = subparsers.add_parser("create", help="create a box")
+    create_parser.add_argument("name")
+    create_parser.add_argument("image")
+    create_parser.add_argument(
+        "--init", action="store_true", help="enter the box once after creating it"
+    )
+    create_parser.set_defaults(func=create)
+
+    export_parser = subparsers.add_parser(
+        "export", help="add applications from a box to the host's menu"
+    )
+    export_parser.add_argument("box")
+    export_parser.add_argument("apps", nargs="+", metavar="app")
+    export_parser.set_defaults(func=export_apps)
+
+    for action, help_text in (
+        ("upgrade", "upgrade boxes"),
+        ("stop", "stop boxes"),
+        ("export-image", "save boxes as image tarballs in your home folder"),
+        ("delete", "delete boxes"),
+    ):
+        action_parser = subparsers.add_parser(action, help=help_text)
+        targets = action_parser.add_mutually_exclusive_group(required=True)
+        targets.add_argument("boxes", nargs="*", default=[], metavar="box")
+        targets.add_argument("--all", action="store_true", help="every box")
+        action_parser.add_argument(
+            "--parallel",
+            type=int,
+            default=1,
+            metavar="N",
+            help="how many boxes to work on at once",
+        )
+        action_parser.set_defaults(func=run_box_action)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = make_parser().parse_args(argv)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
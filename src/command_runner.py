@@ -0,0 +1,321 @@
+import subprocess
+import threading
+import time
+from typing import IO, Any, Callable, Optional
+
+import tracing
+from utils import is_flatpak
+
+_dispatcher: Optional[Callable] = None
+_local = threading.local()
+
+
+def set_dispatcher(dispatcher: Callable):
+    """
+    Sets the function used to deliver callbacks to the main loop,
+    e.g. GLib.idle_add. Without one, callbacks run on the worker thread.
+    """
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+def dispatch(func: Callable, *args):
+    """
+    Calls func(*args) on the main loop, once
+    """
+    if _dispatcher is None:
+        func(*args)
+        return
+
+    def call_once():
+        func(*args)
+        return False
+
+    _dispatcher(call_once)
+
+
+def set_command_observer(observer: Optional[Callable[["Command"], Any]]):
+    """
+    Sets a function to be told about every Command run on this thread,
+    so e.g. a job can cancel the commands it started
+    """
+    _local.observer = observer
+
+
+def get_host_command(command: list[str]) -> list[str]:
+    """
+    Prefixes command with flatpak-spawn when running as flatpak
+    """
+    if is_flatpak() and command[0] != "flatpak-spawn":
+        return ["flatpak-spawn", "--host", *command]
+
+    return command
+
+
+class Command:
+    """
+    A subprocess which can run on a worker thread, with a timeout,
+    cancellation, line streaming and a completion callback.
+
+    on_line is called with each line of stdout as it arrives, and on_done
+    with the finished Command. Both are delivered through dispatch().
+    With text=False, stdout is kept as raw bytes and on_line is not used.
+    on_stdout may then read the raw stdout stream itself as it arrives, on
+    the running thread, so stdout isn't kept at all.
+    With merge_stderr=True, stderr is interleaved into stdout as it arrives,
+    so on_line sees progress which tools like podman write to stderr.
+
+    With bridge=True, a quick command which is run() rather than started may
+    go through the flatpak host bridge instead of its own flatpak-spawn.
+    It can't then be cancelled or time out, so long commands shouldn't use it.
+
+    Every command is traced once it finishes, under the action set on the
+    thread which created it.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        on_line: Optional[Callable[[str], Any]] = None,
+        on_done: Optional[Callable[["Command"], Any]] = None,
+        timeout: Optional[float] = None,
+        text: bool = True,
+        bridge: bool = False,
+        merge_stderr: bool = False,
+        on_stdout: Optional[Callable[[IO[bytes]], Any]] = None,
+    ):
+        self.command = get_host_command(command)
+        self.on_line = on_line
+        self.on_done = on_done
+        self.timeout = timeout
+        self.text = text
+        self.merge_stderr = merge_stderr
+        self.on_stdout = on_stdout
+        self.bridge = bridge and on_line is None and text and timeout is None
+        self.action = tracing.get_action()
+
+        self.stdout: str | bytes = ""
+        self.stderr = ""
+        self.returncode: Optional[int] = None
+        self.cancelled = False
+        self.timed_out = False
+
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+        self._started_at = 0.0
+        self._start_time = 0.0
+        self._stdout_bytes = 0
+        self._stderr_bytes = 0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0 and not self.cancelled and not self.timed_out
+
+    def start(self) -> "Command":
+        """
+        Runs the command on a worker thread
+        """
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def run(self) -> tuple[str, str]:
+        """
+        Runs the command on the current thread, returning stdout and stderr
+        """
+        observer = getattr(_local, "observer", None)
+        if observer:
+            observer(self)
+
+        if not (self.bridge and self._run_through_bridge()):
+            self._run()
+
+        return self.stdout, self.stderr
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            self._terminate()
+
+    def _on_timeout(self):
+        with self._lock:
+            self.timed_out = True
+            self._terminate()
+
+    def _terminate(self):
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+
+    def _run_through_bridge(self) -> bool:
+        """
+        Runs the command through the host bridge, returning whether it could
+        """
+        from host_bridge import get_host_bridge
+
+        host_bridge = get_host_bridge()
+        if host_bridge is None:
+            return False
+
+        self._started_at = time.time()
+        self._start_time = time.perf_counter()
+
+        result = host_bridge.run(self.command)
+        if result is None:
+            return False
+
+        self.returncode, self.stdout, self.stderr = result
+        self._stdout_bytes = len(self.stdout.encode("utf-8"))
+        self._stderr_bytes = len(self.stderr.encode("utf-8"))
+        self._finish()
+
+        return True
+
+    def _run(self):
+        self._started_at = time.time()
+        self._start_time = time.perf_counter()
+
+        try:
+            process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if self.merge_stderr else subprocess.PIPE,
+            )
+        except OSError as e:
+            self.stderr = str(e)
+            self.returncode = 127
+            self._finish()
+            return
+
+        with self._lock:
+            self._process = process
+            if self.cancelled:
+                self._terminate()
+
+        timer = None
+        if self.timeout:
+            timer = threading.Timer(self.timeout, self._on_timeout)
+            timer.daemon = True
+            timer.start()
+
+        # stderr is drained separately so a chatty process cannot block on it
+        err_chunks = []
+        err_thread = None
+        if process.stderr is not None:
+            err_thread = threading.Thread(
+                target=lambda: err_chunks.append(process.stderr.read()), daemon=True
+            )
+            err_thread.start()
+
+        if self.text:
+            out_lines = []
+            for raw_line in process.stdout:
+                self._stdout_bytes += len(raw_line)
+                line = raw_line.decode("utf-8", errors="replace")
+                out_lines.append(line)
+
+                if self.on_line:
+                    dispatch(self.on_line, line.rstrip("\n"))
+
+            self.stdout = "".join(out_lines)
+        elif self.on_stdout:
+            stdout = _CountingReader(process.stdout)
+            self.stdout = b""
+            try:
+                self.on_stdout(stdout)
+            finally:
+                # whatever wasn't read is drained, so the process can exit
+                while stdout.read(65536):
+                    pass
+            self._stdout_bytes = stdout.bytes_read
+        else:
+            self.stdout = process.stdout.read()
+            self._stdout_bytes = len(self.stdout)
+
+        process.wait()
+        if err_thread:
+            err_thread.join()
+        if timer:
+            timer.cancel()
+
+        raw_stderr = b"".join(err_chunks)
+        self._stderr_bytes = len(raw_stderr)
+        self.stderr = raw_stderr.decode("utf-8", errors="replace")
+        self.returncode = process.returncode
+        self._finish()
+
+    def _finish(self):
+        thread = threading.current_thread()
+        tracing.record(
+            tracing.CommandTrace(
+                command=self.command,
+                action=self.action,
+                thread=thread.name,
+                thread_id=thread.ident or 0,
+                started_at=self._started_at,
+                duration=time.perf_counter() - self._start_time,
+                returncode=self.returncode,
+                stdout_bytes=self._stdout_bytes,
+                stderr_bytes=self._stderr_bytes,
+                cancelled=self.cancelled,
+                timed_out=self.timed_out,
+            )
+        )
+
+        self._finished.set()
+
+        if self.on_done:
+            dispatch(self.on_done, self)
+
+
+class _CountingReader:
+    """
+    Reads a stream, counting the bytes read for the command's trace
+    """
+
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def run_in_background(
+    func: Callable,
+    *args,
+    on_done: Optional[Callable] = None,
+    on_error: Optional[Callable[[Exception], Any]] = None,
+):
+    """
+    Calls func(*args) on a worker thread, then passes the result to on_done
+    on the main loop. Commands it runs are traced under the caller's action,
+    or func's name if there is none.
+    """
+    action = tracing.get_action(default=func.__qualname__.replace(".<locals>", ""))
+
+    def bg_func():
+        tracing.set_action(action)
+
+        try:
+            result = func(*args)
+        except Exception as e:
+            if on_error is None:
+                raise
+
+            dispatch(on_error, e)
+            return
+
+        if on_done:
+            dispatch(on_done, result)
+
+    thread = threading.Thread(target=bg_func, daemon=True)
+    thread.start()
+
+    return thread
@@ -0,0 +1,88 @@
+import os
+import re
+from typing import Optional
+
+KEYS = ("Name", "Exec", "Icon", "NoDisplay", "Hidden", "Type")
+
+FIELD_CODE_RE = re.compile(r"%(.)")
+
+
+def parse_desktop_file(text: str) -> dict[str, str]:
+    """
+    Reads the [Desktop Entry] keys BoxBuddy needs, first occurrence winning
+    """
+    entry = {}
+    in_entry = False
+
+    for line in text.splitlines():
+        line = line.strip()
+
+        if line.startswith("["):
+            in_entry = line == "[Desktop Entry]"
+            continue
+
+        if not in_entry or "=" not in line:
+            continue
+
+        key, value = line.split("=", 1)
+        key = key.strip()
+
+        if key.split("[")[0] in KEYS and key not in entry:
+            entry[key] = value.strip()
+
+    return entry
+
+
+def is_visible(entry: dict[str, str]) -> bool:
+    if entry.get("NoDisplay", "").lower() == "true":
+        return False
+
+    if entry.get("Hidden", "").lower() == "true":
+        return False
+
+    return entry.get("Type", "Application") == "Application"
+
+
+def get_locales() -> list[str]:
+    """
+    Gets the Name[xx] suffixes to try for the current locale, most specific first
+    """
+    lang = os.getenv("LC_ALL") or os.getenv("LC_MESSAGES") or os.getenv("LANG") or ""
+    lang = lang.split(".")[0].split("@")[0]
+
+    if not lang or lang in ("C", "POSIX"):
+        return []
+
+    locales = [lang]
+    if "_" in lang:
+        locales.append(lang.split("_")[0])
+
+    return locales
+
+
+def get_localised_name(entry: dict[str, str]) -> str:
+    for locale in get_locales():
+        name = entry.get(f"Name[{locale}]")
+        if name:
+            return name
+
+    return entry.get("Name", "")
+
+
+def strip_field_codes(exec_line: str) -> str:
+    """
+    Removes %f, %U etc. from an Exec line, unescaping %%
+    """
+    exec_line = FIELD_CODE_RE.sub(
+        lambda match: "%" if match.group(1) == "%" else "", exec_line
+    )
+
+    return " ".join(exec_line.split())
+
+
+def get_desktop_file_id(path: str) -> Optional[str]:
+    file_name = os.path.basename(path)
+    if not file_name.endswith(".desktop"):
+        return None
+
+    return file_name[: -len(".desktop")]
@@ -1,14 +1,116 @@
+import io
+import json
 import shutil
 import os
-import subprocess
-from dataclasses import dataclass
-from typing import Tuple, List
-
+import re
+import tarfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import IO, Callable, Optional, Tuple, List
+
+from cache import read_json_cache, remove_cache, write_json_cache
+from command_runner import Command, run_in_background
+from desktop_entries import (
+    get_desktop_file_id,
+    get_locales,
+    get_localised_name,
+    is_visible,
+    parse_desktop_file,
+    strip_field_codes,
+)
+from host_info import get_host_info
+from icon_cache import (
+    drop_icon_cache,
+    get_cached_icons,
+    get_uncached_icons,
+    store_icons,
+)
+from settings import get_setting
+from shell_session import ShellSession
 from utils import detect_terminal, is_flatpak, run_command_and_get_output
 
 FLATPAK_SPAWN = "flatpak-spawn --host " if is_flatpak() else ""
 FLATPAK_SPAWN_ARR = ["flatpak-spawn", "--host"] if is_flatpak() else []
 
+# the image list only changes between distrobox releases
+IMAGES_CACHE_TTL = 7 * 24 * 60 * 60
+
+# runs an app in the background, detached from the shell which started it
+LAUNCH_DETACHED_SCRIPT = (
+    'if command -v setsid >/dev/null; then setsid "$@" >/dev/null 2>&1 & '
+    'else nohup "$@" >/dev/null 2>&1 & fi'
+)
+
+# exports each app in "$@", printing its output and then a status line
+EXPORT_STATUS_MARKER = "__boxbuddy_exported"
+EXPORT_APPS_SCRIPT = (
+    'for app in "$@"; do '
+    'out=$(distrobox-export -a "$app" 2>&1); rc=$?; '
+    'printf "%s\\n" "$out"; '
+    f'printf "{EXPORT_STATUS_MARKER} %s %s\\n" "$rc" "$app"; '
+    "done"
+)
+
+# where an app's icon may be in its box, best first
+ICON_CANDIDATES = (
+    "{icon}",
+    "/usr/share/icons/hicolor/64x64/apps/{icon}.png",
+    "/usr/share/icons/hicolor/128x128/apps/{icon}.png",
+    "/usr/share/icons/hicolor/scalable/apps/{icon}.svg",
+    "/usr/share/icons/hicolor/256x256/apps/{icon}.png",
+    "/usr/share/icons/hicolor/48x48/apps/{icon}.png",
+    "/usr/share/pixmaps/{icon}.png",
+    "/usr/share/pixmaps/{icon}.svg",
+    "/usr/share/pixmaps/{icon}.xpm",
+    "/usr/share/pixmaps/{icon}",
+)
+
+# the dirs holding the candidates, which are all a stopped box's cp reads
+ICON_DIRS = tuple(
+    dict.fromkeys(
+        os.path.dirname(candidate)
+        for candidate in ICON_CANDIDATES
+        if candidate.startswith("/")
+    )
+)
+
+ICON_CANDIDATE_ARGS = " ".join(
+    f'"{candidate.format(icon="$icon")}"' for candidate in ICON_CANDIDATES
+)
+
+# finds a file for each icon in "$@", naming it on stderr, then writes all
+# the files found as one tar to stdout
+ICON_MARKER = "__boxbuddy_icon"
+EXTRACT_ICONS_SCRIPT = f"""
+for icon in "$@"; do
+    shift
+    found=""
+    for candidate in {ICON_CANDIDATE_ARGS}; do
+        case "$candidate" in
+            /*) [ -f "$candidate" ] && found="$candidate" && break ;;
+        esac
+    done
+    printf "{ICON_MARKER}\\t%s\\t%s\\n" "$icon" "$found" >&2
+    [ -n "$found" ] && set -- "$@" "$found"
+done
+[ "$#" -gt 0 ] || exit 0
+exec tar -chf - -- "$@" 2>/dev/null
+"""
+
+# units used by podman and docker in `stats` output
+SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000**2,
+    "gb": 1000**3,
+    "tb": 1000**4,
+    "kib": 1024,
+    "mib": 1024**2,
+    "gib": 1024**3,
+    "tib": 1024**4,
+}
+
 
 @dataclass
 class Distrobox:
@@ -19,6 +121,31 @@ class Distrobox:
     status: str
 
 
+@dataclass
+class BoxEvent:
+    container_id: str
+    name: str
+    action: str
+
+
+@dataclass
+class BoxStats:
+    container_id: str
+    cpu_percent: float
+    mem_bytes: int
+    mem_percent: float
+    pids: int
+    block_read_bytes: int
+    block_write_bytes: int
+
+
+@dataclass
+class AppExportResult:
+    app: str
+    succeeded: bool
+    log: str
+
+
 @dataclass
 class LocalApp:
     name: str
@@ -27,14 +154,110 @@ class LocalApp:
     desktop_file: str
 
 
+def get_container_manager() -> Optional[str]:
+    """
+    Finds the container engine distrobox uses
+    """
+    return get_host_info().container_manager
+
+
 def get_all_distroboxes() -> List[Distrobox]:
     """
-    Fetches all distroboxes
+    Fetches all distroboxes, asking the container engine directly
+    and falling back to parsing `distrobox list`. No boxes from the engine
+    is inconclusive, as distrobox may be set up to use the other engine.
+    """
+    distroboxes = get_distroboxes_from_engine()
+    if distroboxes:
+        return distroboxes
+
+    return get_distroboxes_from_distrobox_list()
+
+
+def get_distroboxes_from_engine() -> Optional[List[Distrobox]]:
+    """
+    Lists distrobox containers with a single `ps` call to podman or docker.
+    Returns None if that is not possible.
+    """
+    manager = get_container_manager()
+    if not manager:
+        return None
+
+    output_format = "json" if manager == "podman" else "{{json .}}"
+    out, err = run_command_and_get_output(
+        [
+            *FLATPAK_SPAWN_ARR,
+            manager,
+            "ps",
+            "-a",
+            "--no-trunc",
+            "--filter",
+            "label=manager=distrobox",
+            "--format",
+            output_format,
+        ],
+        bridge=True,
+    )
+
+    if err and not out.strip():
+        return None
+
+    return parse_engine_ps_output(out)
+
+
+def parse_engine_ps_output(out: str) -> Optional[List[Distrobox]]:
+    """
+    Parses `ps` json from podman (one array) or docker (one object per line)
+    """
+    out = out.strip()
+    if not out:
+        return []
+
+    try:
+        containers = json.loads(out)
+    except ValueError:
+        try:
+            containers = [json.loads(line) for line in out.splitlines() if line]
+        except ValueError:
+            return None
+
+    if isinstance(containers, dict):
+        containers = [containers]
+
+    distroboxes = []
+    for container in containers:
+        if not isinstance(container, dict):
+            return None
+
+        names = container.get("Names") or ""
+        if isinstance(names, list):
+            names = names[0] if names else ""
+        name = names.split(",")[0]
+
+        container_id = container.get("Id") or container.get("ID") or ""
+        image_url = container.get("Image") or ""
+
+        distroboxes.append(
+            Distrobox(
+                name=name,
+                distro=try_parse_disto_name_from_url(image_url),
+                image_url=image_url,
+                container_id=container_id[:12],
+                status=container.get("Status") or container.get("State") or "",
+            )
+        )
+
+    return distroboxes
+
+
+def get_distroboxes_from_distrobox_list() -> List[Distrobox]:
+    """
+    Parses the table printed by `distrobox list`
     """
     distroboxes = []
 
     out, err = run_command_and_get_output(
-        [*FLATPAK_SPAWN_ARR, "distrobox", "list", "--no-color"]
+        [*FLATPAK_SPAWN_ARR, "distrobox", "list", "--no-color"], bridge=True
     )
 
     if not out:
@@ -87,6 +310,91 @@ def get_all_distroboxes() -> List[Distrobox]:
     return distroboxes
 
 
+def watch_box_events(
+    on_event: Callable[[BoxEvent], None],
+    on_stopped: Optional[Callable[[Command], None]] = None,
+) -> Optional[Command]:
+    """
+    Starts a long-lived `events` stream from the container engine, calling
+    on_event on the main loop for each distrobox container event, and
+    on_stopped if the stream ends.
+    Returns the running Command, or None if there is no engine to watch.
+    """
+    manager = get_container_manager()
+    if not manager:
+        return None
+
+    output_format = "json" if manager == "podman" else "{{json .}}"
+
+    def on_line(line: str):
+        event = parse_engine_event(line)
+        if event:
+            on_event(event)
+
+    return Command(
+        [
+            *FLATPAK_SPAWN_ARR,
+            manager,
+            "events",
+            "--filter",
+            "type=container",
+            "--filter",
+            "label=manager=distrobox",
+            "--format",
+            output_format,
+        ],
+        on_line=on_line,
+        on_done=on_stopped,
+    ).start()
+
+
+def parse_engine_event(line: str) -> Optional[BoxEvent]:
+    """
+    Parses one line of podman or docker `events` json
+    """
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+
+    if not isinstance(event, dict):
+        return None
+
+    # docker nests the container under "Actor"
+    actor = event.get("Actor") or {}
+    attributes = actor.get("Attributes") or {}
+
+    container_id = event.get("ID") or event.get("id") or actor.get("ID") or ""
+    name = event.get("Name") or attributes.get("name") or ""
+    action = event.get("Status") or event.get("Action") or event.get("status") or ""
+
+    if not container_id or not action:
+        return None
+
+    return BoxEvent(container_id=container_id[:12], name=name, action=action)
+
+
+def save_box_snapshot(boxes: List[Distrobox]):
+    """
+    Persists the box list so the next launch can render it straight away
+    """
+    write_json_cache("boxes.json", [asdict(box) for box in boxes])
+
+
+def load_box_snapshot() -> List[Distrobox]:
+    """
+    Loads the box list saved by the last refresh, which may be stale
+    """
+    snapshot = read_json_cache("boxes.json")
+    if not isinstance(snapshot, list):
+        return []
+
+    try:
+        return [Distrobox(**box) for box in snapshot]
+    except TypeError:
+        return []
+
+
 def try_parse_disto_name_from_url(image_url: str):
     distros = (
         "ubuntu",
@@ -132,33 +440,99 @@ def try_parse_disto_name_from_url(image_url: str):
 
 
 def open_terminal_in_box(box_name: str):
-    terminal, terminal_exec_arg = detect_terminal()
+    """
+    Runs `distrobox enter` in a terminal without waiting for it, so an open
+    terminal doesn't hold up other work on the box
+    """
+    Command(
+        [*FLATPAK_SPAWN_ARR, *detect_terminal(), "distrobox", "enter", box_name]
+    ).start()
 
-    subprocess.Popen(
-        [
-            *FLATPAK_SPAWN_ARR,
-            terminal,
-            terminal_exec_arg,
-            "distrobox",
-            "enter",
-            box_name,
-        ]
-    )
 
+_box_sessions: dict[str, ShellSession] = {}
+_box_sessions_lock = threading.Lock()
+
+
+def get_box_session(box_name: str) -> Optional[ShellSession]:
+    """
+    Gets the box's shared shell session, so commands don't each pay for
+    `distrobox enter`. None unless turned on in preferences.
+    """
+    if not get_setting("exec_sessions"):
+        return None
+
+    with _box_sessions_lock:
+        if box_name not in _box_sessions:
+            _box_sessions[box_name] = ShellSession(
+                [*FLATPAK_SPAWN_ARR, "distrobox", "enter", box_name, "--", "sh"]
+            )
+
+        return _box_sessions[box_name]
+
+
+def close_box_session(box_name: str):
+    with _box_sessions_lock:
+        session = _box_sessions.pop(box_name, None)
+
+    if session:
+        session.close()
+
+
+def close_box_sessions():
+    with _box_sessions_lock:
+        sessions = list(_box_sessions.values())
+        _box_sessions.clear()
+
+    for session in sessions:
+        session.close()
+
+
+def run_command_in_box(command: str | list[str], box_name: str, *args):
+    if isinstance(command, str):
+        command = command.split(" ")
+
+    session = get_box_session(box_name)
+    if session:
+        returncode, out, err = session.run(command)
+        return out, err
 
-def run_command_in_box(command: str, box_name: str, *args):
     cmd = [
         *FLATPAK_SPAWN_ARR,
         "distrobox",
         "enter",
         box_name,
         "--",
-        *command.split(" "),
+        *command,
     ]
 
     return run_command_and_get_output(cmd)
 
 
+def launch_app_in_box(exec_name: str, box_name: str, *args) -> Optional[Command]:
+    """
+    Starts an app without waiting for it to exit. Through a session, the app
+    is detached from the session's shell, and None is returned.
+    """
+    session = get_box_session(box_name)
+    if session:
+        run_in_background(
+            session.run,
+            ["sh", "-c", LAUNCH_DETACHED_SCRIPT, "sh", *exec_name.split(" ")],
+        )
+        return None
+
+    return Command(
+        [
+            *FLATPAK_SPAWN_ARR,
+            "distrobox",
+            "enter",
+            box_name,
+            "--",
+            *exec_name.split(" "),
+        ]
+    ).start()
+
+
 def create_list_local_script_if_not_exists():
     script_dir = os.path.join(
         os.path.abspath(os.path.dirname(__file__)), "boxbuddy-list-local-apps.sh"
@@ -176,78 +550,800 @@ def create_list_local_script_if_not_exists():
     return script_dir
 
 
-def get_apps_in_box(box_name: str) -> list[LocalApp]:
+def get_apps_in_box(box_name: str, container_id: str = "") -> list[LocalApp]:
+    """
+    Lists a box's applications. With a container_id, they are read from the
+    host without starting the box where possible, otherwise the cached list
+    is returned unless the box's applications dir has changed since.
+    """
+    if container_id:
+        read_from_host = get_apps_from_box_filesystem(container_id)
+
+        if read_from_host is not None:
+            fingerprint, local_apps = read_from_host
+            write_apps_cache(container_id, fingerprint, local_apps)
+
+            return local_apps
+
+    known_fingerprint = "none"
+    if container_id:
+        cached = read_apps_cache(container_id)
+        if cached is not None:
+            known_fingerprint = cached.get("fingerprint", "none")
+
     script_path = create_list_local_script_if_not_exists()
 
-    out, err = run_command_in_box(script_path, box_name)
+    out, err = run_command_in_box(
+        [script_path, "/usr/share/applications", known_fingerprint], box_name
+    )
 
-    if not out:
-        return []
+    fingerprint, local_apps = parse_listed_apps(out)
+
+    if fingerprint and fingerprint == known_fingerprint:
+        return get_cached_apps_in_box(container_id) or []
+
+    if container_id and fingerprint:
+        write_apps_cache(container_id, fingerprint, local_apps)
+
+    return local_apps
+
+
+def get_apps_from_box_filesystem(
+    container_id: str,
+) -> Optional[tuple[str, list[LocalApp]]]:
+    """
+    Reads /usr/share/applications out of the container's filesystem with
+    `cp`, which works on stopped containers without starting them.
+    Returns the fingerprint and apps, or None if the engine can't do this.
+    """
+    manager = get_container_manager()
+    if not manager:
+        return None
+
+    command = Command(
+        [
+            *FLATPAK_SPAWN_ARR,
+            manager,
+            "cp",
+            f"{container_id}:/usr/share/applications",
+            "-",
+        ],
+        text=False,
+    )
+    command.run()
+
+    if not command.succeeded or not command.stdout:
+        return None
+
+    try:
+        with tarfile.open(fileobj=io.BytesIO(command.stdout), mode="r:") as tar:
+            return parse_applications_tar(tar)
+    except tarfile.TarError:
+        return None
+
+
+def parse_applications_tar(tar: tarfile.TarFile) -> tuple[str, list[LocalApp]]:
+    """
+    Parses the .desktop files in a tar of an applications dir, with the
+    same fingerprint as boxbuddy-list-local-apps.sh
+    """
+    members = {member.name.rstrip("/"): member for member in tar.getmembers()}
+
+    dir_mtime = 0
+    desktop_members = []
+    for name, member in members.items():
+        if member.isdir() and "/" not in name:
+            dir_mtime = int(member.mtime)
+        elif name.count("/") == 1 and name.endswith(".desktop"):
+            desktop_members.append(member)
 
     local_apps = []
+    for member in sorted(desktop_members, key=lambda m: m.name):
+        path = member.name
 
-    desktop_files = out.split("\n")
-    if len(desktop_files) == 1 and "No such file" in desktop_files[0]:
-        return []
+        # relative links within the dir can be followed, others can't
+        if member.issym() and not member.linkname.startswith("/"):
+            dir_name = os.path.dirname(member.name)
+            member = members.get(os.path.normpath(f"{dir_name}/{member.linkname}"))
 
-    for file in desktop_files:
-        if ";" not in file:
+        if member is None or not member.isfile():
             continue
 
-        parts = file.split(";")
-        if len(parts) != 4:
+        desktop_file = tar.extractfile(member)
+        if desktop_file is None:
             continue
 
-        ex = parts[3]
-        ex = ex.replace(" %U", "").replace(" %F", "")
+        entry = parse_desktop_file(desktop_file.read().decode("utf-8", "replace"))
+        app = local_app_from_entry(path, entry)
+        if app:
+            local_apps.append(app)
 
-        app = LocalApp(
-            name=parts[2].strip(),
-            exec_name=ex.strip(),
-            icon=parts[1].strip(),
-            desktop_file=parts[0].strip(),
-        )
-        local_apps.append(app)
+    return f"{dir_mtime}:{len(desktop_members)}", local_apps
+
+
+def get_cached_apps_in_box(container_id: str) -> Optional[list[LocalApp]]:
+    """
+    Gets the apps from the last scan of this box, if there was one
+    """
+    cached = read_apps_cache(container_id)
+    if cached is None:
+        return None
+
+    try:
+        return [LocalApp(**app) for app in cached.get("apps", [])]
+    except TypeError:
+        return None
 
-    return local_apps
+
+def read_apps_cache(container_id: str) -> Optional[dict]:
+    """
+    Reads the box's last scan, unless it was made in another locale, as
+    apps' names are localised
+    """
+    cached = read_json_cache(f"{container_id}.json", "apps")
+    if not isinstance(cached, dict) or cached.get("locale") != get_locales():
+        return None
+
+    return cached
+
+
+def write_apps_cache(container_id: str, fingerprint: str, local_apps: list[LocalApp]):
+    write_json_cache(
+        f"{container_id}.json",
+        {
+            "fingerprint": fingerprint,
+            "locale": get_locales(),
+            "apps": [asdict(app) for app in local_apps],
+        },
+        "apps",
+    )
+
+
+def drop_apps_cache(container_id: str):
+    remove_cache(f"{container_id}.json", "apps")
 
 
-def export_app_from_box(box_name: str, app: str):
-    cmd = f"distrobox-export -a {app}"
+def parse_listed_apps(out: str) -> tuple[str, list[LocalApp]]:
+    """
+    Parses the json lines printed by boxbuddy-list-local-apps.sh,
+    returning the fingerprint and apps
+    """
+    fingerprint = ""
+    local_apps = []
+
+    for line in out.splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
 
-    return run_command_in_box(cmd, box_name)
+        if not isinstance(entry, dict):
+            continue
+
+        if "fingerprint" in entry:
+            fingerprint = entry["fingerprint"]
+            continue
+
+        app = local_app_from_entry(entry.pop("file", ""), entry)
+        if app:
+            local_apps.append(app)
+
+    return fingerprint, local_apps
+
+
+def local_app_from_entry(path: str, entry: dict[str, str]) -> Optional[LocalApp]:
+    desktop_file = get_desktop_file_id(path)
+    if not desktop_file or not is_visible(entry):
+        return None
+
+    name = get_localised_name(entry)
+    exec_name = strip_field_codes(entry.get("Exec", ""))
+    if not name or not exec_name:
+        return None
+
+    return LocalApp(
+        name=name,
+        exec_name=exec_name,
+        icon=entry.get("Icon", ""),
+        desktop_file=desktop_file,
+    )
+
+
+def extract_icons_from_box(container_id: str, icons: list[str]) -> dict[str, str]:
+    """
+    Copies the box's icons which aren't cached yet out of the box, returning
+    the box's cached icons. A running box finds its icons and sends them as
+    one tar through `exec`. A stopped box isn't started: its icon dirs are
+    read with `cp`, as with its applications.
+    """
+    fingerprint = get_apps_fingerprint(container_id)
+    uncached = get_uncached_icons(
+        container_id, [icon for icon in icons if icon], fingerprint
+    )
+
+    manager = get_container_manager()
+    if not uncached or not manager:
+        return get_cached_icons(container_id)
+
+    found = extract_icons_with_exec(manager, container_id, uncached)
+    if found is None:
+        found = extract_icons_with_cp(manager, container_id, uncached)
+
+    # icons which couldn't be looked for are left to be tried again
+    paths, files = found
+    reached = [icon for icon in uncached if icon in paths]
+
+    return store_icons(
+        container_id, fingerprint, reached, [paths[icon] for icon in reached], files
+    )
+
+
+def get_apps_fingerprint(container_id: str) -> str:
+    cached = read_apps_cache(container_id)
+    if cached is None:
+        return ""
+
+    return cached.get("fingerprint", "")
+
+
+def extract_icons_with_exec(
+    manager: str, container_id: str, icons: list[str]
+) -> Optional[tuple[dict[str, str], dict[str, bytes]]]:
+    """
+    Finds and copies the icons with one script in a running box, returning
+    the file found for each icon and the files' contents, or None if the
+    box isn't running
+    """
+    command = Command(
+        [
+            *FLATPAK_SPAWN_ARR,
+            manager,
+            "exec",
+            container_id,
+            "sh",
+            "-c",
+            EXTRACT_ICONS_SCRIPT,
+            "sh",
+            *icons,
+        ],
+        text=False,
+    )
+    command.run()
+
+    paths = parse_extracted_icons(command.stderr)
+    if not paths and not command.succeeded:
+        return None
+
+    files = read_tar_files(command.stdout or b"", "/", set(paths.values()))
+
+    return paths, files
+
+
+def extract_icons_with_cp(
+    manager: str, container_id: str, icons: list[str]
+) -> tuple[dict[str, str], dict[str, bytes]]:
+    """
+    Reads the icons out of a stopped box's filesystem with `cp`, which can't
+    run a script to find them, so the candidate dirs are streamed through
+    and searched here. Only the wanted files are kept.
+    """
+    candidates = {icon: get_icon_candidates(icon) for icon in icons}
+    wanted = {path for paths in candidates.values() for path in paths}
+
+    # icons given by a path outside the candidate dirs are copied one by one
+    sources = list(ICON_DIRS)
+    for icon in icons:
+        if icon.startswith("/") and os.path.dirname(icon) not in ICON_DIRS:
+            sources.append(icon)
+
+    files = {}
+    links = {}
+    copied_sources = 0
+    for source in sources:
+        if copy_tar_files(manager, container_id, source, wanted, files, links):
+            copied_sources += 1
+
+    if not copied_sources:
+        return {}, {}
+
+    # links to files the stream had already passed are copied on their own
+    for path, target in links.items():
+        if target not in files:
+            copy_tar_files(manager, container_id, target, {target}, files, {})
+
+        if target in files:
+            files[path] = files[target]
+
+    paths = {}
+    for icon, icon_candidates in candidates.items():
+        paths[icon] = next((path for path in icon_candidates if path in files), "")
+
+    return paths, files
+
+
+def copy_tar_files(
+    manager: str,
+    container_id: str,
+    source: str,
+    wanted: set[str],
+    files: dict[str, bytes],
+    links: dict[str, str],
+) -> bool:
+    """
+    Streams source out of a stopped box with `cp`, adding the wanted files
+    to files and the wanted links to links. Returns whether it was copied.
+    """
+    root = os.path.dirname(source)
+    command = Command(
+        [*FLATPAK_SPAWN_ARR, manager, "cp", f"{container_id}:{source}", "-"],
+        text=False,
+        on_stdout=lambda stdout: read_tar_stream(stdout, root, wanted, files, links),
+    )
+    command.run()
+
+    return command.succeeded
+
+
+def get_icon_candidates(icon: str) -> list[str]:
+    candidates = [candidate.format(icon=icon) for candidate in ICON_CANDIDATES]
+
+    return [candidate for candidate in candidates if candidate.startswith("/")]
+
+
+def read_tar_stream(
+    stream: IO[bytes],
+    root: str,
+    wanted: set[str],
+    files: dict[str, bytes],
+    links: dict[str, str],
+):
+    """
+    Reads the wanted files from a tar of the dir at root as it streams in,
+    by absolute path. A stream can't go back for a link's target, so wanted
+    links are added to links, and their targets to wanted if still to come.
+    """
+    try:
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            for member in tar:
+                path = os.path.join(root, member.name.lstrip("/"))
+                if path not in wanted:
+                    continue
+
+                if member.issym():
+                    target = os.path.normpath(
+                        os.path.join(os.path.dirname(path), member.linkname)
+                    )
+                    links[path] = target
+                    wanted.add(target)
+                elif member.isfile():
+                    extracted = tar.extractfile(member)
+                    if extracted is not None:
+                        files[path] = extracted.read()
+    except tarfile.TarError:
+        pass
+
+
+def read_tar_files(archive: bytes, root: str, wanted: set[str]) -> dict[str, bytes]:
+    """
+    Reads the wanted files from a tar of the dir at root, by absolute path.
+    Links aren't followed, so the tar should hold the files they point to.
+    """
+    files = {}
+    read_tar_stream(io.BytesIO(archive), root, wanted, files, {})
+
+    return files
+
+
+def parse_extracted_icons(err: str) -> dict[str, str]:
+    found = {}
+
+    for line in err.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 3 and parts[0] == ICON_MARKER:
+            found[parts[1]] = parts[2]
+
+    return found
+
+
+def export_apps_from_box(box_name: str, apps: list[str]) -> list[AppExportResult]:
+    """
+    Adds several of a box's apps to the host's menu with a single
+    `distrobox enter`, reporting each app's outcome
+    """
+    if not apps:
+        return []
+
+    out, err = run_command_in_box(
+        ["sh", "-c", EXPORT_APPS_SCRIPT, "sh", *apps], box_name
+    )
+
+    return parse_exported_apps(out, err, apps)
+
+
+def parse_exported_apps(out: str, err: str, apps: list[str]) -> list[AppExportResult]:
+    results = {}
+    log_lines = []
+
+    for line in out.splitlines():
+        parts = line.split(" ", 2)
+        if len(parts) == 3 and parts[0] == EXPORT_STATUS_MARKER:
+            results[parts[2]] = AppExportResult(
+                app=parts[2],
+                succeeded=parts[1] == "0",
+                log="\n".join(log_lines).strip(),
+            )
+            log_lines = []
+        else:
+            log_lines.append(line)
+
+    # apps with no status never ran, e.g. because the box couldn't be entered
+    return [
+        results.get(app) or AppExportResult(app=app, succeeded=False, log=err)
+        for app in apps
+    ]
+
+
+def get_exported_apps(box_name: str) -> set[str]:
+    """
+    Finds which of the box's apps are already in the host's menu, from the
+    <box>-<app>.desktop files distrobox-export writes
+    """
+    apps_dir = os.path.join(os.path.expanduser("~"), ".local", "share", "applications")
+
+    try:
+        file_names = os.listdir(apps_dir)
+    except OSError:
+        return set()
+
+    prefix = f"{box_name}-"
+    return {
+        file_name[len(prefix) : -len(".desktop")]
+        for file_name in file_names
+        if file_name.startswith(prefix) and file_name.endswith(".desktop")
+    }
 
 
 def upgrade_box(box_name: str):
-    terminal, terminal_exec_arg = detect_terminal()
+    """
+    Runs `distrobox upgrade` in a terminal, returning once the terminal
+    closes, so a job running it holds the box until the upgrade is done
+    """
+    Command(
+        [*FLATPAK_SPAWN_ARR, *detect_terminal(), "distrobox", "upgrade", box_name]
+    ).run()
+
+
+def upgrade_box_headless(box_name: str) -> Command:
+    """
+    Runs distrobox upgrade without a terminal, for batch upgrades
+    """
+    command = Command([*FLATPAK_SPAWN_ARR, "distrobox", "upgrade", box_name])
+    command.run()
+
+    return command
+
+
+def stop_box(box_name: str) -> Command:
+    close_box_session(box_name)
+
+    command = Command([*FLATPAK_SPAWN_ARR, "distrobox", "stop", box_name, "-Y"])
+    command.run()
+
+    return command
+
+
+def start_box(box_name: str) -> Command:
+    """
+    Starts a box and runs distrobox's setup, without opening anything
+    """
+    command = Command(
+        [*FLATPAK_SPAWN_ARR, "distrobox", "enter", box_name, "--", "true"]
+    )
+    command.run()
+
+    return command
+
+
+def get_box_processes(box_name: str) -> Optional[list[str]]:
+    """
+    Gets the command names of every process running in a box
+    """
+    manager = get_container_manager()
+    if not manager:
+        return None
 
-    subprocess.Popen(
+    if manager == "podman":
+        cmd = [manager, "top", box_name, "comm"]
+    else:
+        cmd = [manager, "top", box_name, "-o", "comm"]
+
+    command = Command([*FLATPAK_SPAWN_ARR, *cmd], bridge=True)
+    command.run()
+    if not command.succeeded:
+        return None
+
+    # first line is the COMMAND heading
+    return [line.strip() for line in command.stdout.splitlines()[1:] if line.strip()]
+
+
+def get_box_stats(container_ids: list[str]) -> dict[str, BoxStats]:
+    """
+    Samples resource usage of the given running boxes with a single
+    `stats` call, keyed by short container id
+    """
+    manager = get_container_manager()
+    if not manager or not container_ids:
+        return {}
+
+    output_format = "json" if manager == "podman" else "{{json .}}"
+    command = Command(
         [
             *FLATPAK_SPAWN_ARR,
-            terminal,
-            terminal_exec_arg,
-            "distrobox",
-            "upgrade",
-            box_name,
-        ]
+            manager,
+            "stats",
+            "--no-stream",
+            "--format",
+            output_format,
+            *container_ids,
+        ],
+        timeout=30,
     )
+    command.run()
+
+    return parse_engine_stats_output(command.stdout)
+
+
+def parse_engine_stats_output(out: str) -> dict[str, BoxStats]:
+    """
+    Parses `stats` json from podman (one array) or docker (one object per line)
+    """
+    out = out.strip()
+    if not out:
+        return {}
+
+    try:
+        samples = json.loads(out)
+    except ValueError:
+        samples = []
+        for line in out.splitlines():
+            try:
+                samples.append(json.loads(line))
+            except ValueError:
+                continue
+
+    if isinstance(samples, dict):
+        samples = [samples]
+
+    stats = {}
+    for sample in samples:
+        if not isinstance(sample, dict):
+            continue
+
+        # podman uses snake_case keys, docker uses CamelCase ones
+        container_id = (sample.get("id") or sample.get("ID") or "")[:12]
+        if not container_id:
+            continue
+
+        mem_usage = sample.get("mem_usage") or sample.get("MemUsage") or ""
+        block_io = sample.get("block_io") or sample.get("BlockIO") or ""
+        block_read, _, block_write = block_io.partition("/")
+
+        stats[container_id] = BoxStats(
+            container_id=container_id,
+            cpu_percent=parse_percent(
+                sample.get("cpu_percent") or sample.get("CPUPerc")
+            ),
+            mem_bytes=parse_size(mem_usage.split("/")[0]),
+            mem_percent=parse_percent(
+                sample.get("mem_percent") or sample.get("MemPerc")
+            ),
+            pids=int(parse_percent(sample.get("pids") or sample.get("PIDs"))),
+            block_read_bytes=parse_size(block_read),
+            block_write_bytes=parse_size(block_write),
+        )
 
+    return stats
 
-def delete_box(box_name: str):
-    return run_command_and_get_output(f"distrobox rm {box_name} -f".split(" "))
 
+def parse_percent(value) -> float:
+    """
+    Parses e.g. "1.25%", "--" or a plain number
+    """
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return 0.0
+
+
+def parse_size(value: str) -> int:
+    """
+    Parses a size like "12.5MiB" or "1.2 GB" into bytes
+    """
+    match = re.match(r"\s*([\d.]+)\s*([a-zA-Z]*)", value or "")
+    if not match:
+        return 0
+
+    number, unit = match.groups()
+    try:
+        return int(float(number) * SIZE_UNITS.get(unit.lower() or "b", 1))
+    except ValueError:
+        return 0
+
+
+def remove_box(box_name: str, container_id: str = "") -> Command:
+    if container_id:
+        drop_apps_cache(container_id)
+        drop_icon_cache(container_id)
+
+    close_box_session(box_name)
+
+    command = Command([*FLATPAK_SPAWN_ARR, "distrobox", "rm", box_name, "-f"])
+    command.run()
 
-def create_box(box_name: str, image: str):
+    return command
+
+
+def delete_box(box_name: str, container_id: str = ""):
+    command = remove_box(box_name, container_id)
+
+    return command.stdout, command.stderr
+
+
+def export_box_image(box_name: str, export_dir: str = "") -> Command:
+    """
+    Commits a box to an image and saves it as a tar archive in export_dir,
+    which defaults to the home directory
+    """
+    manager = get_container_manager() or "podman"
+    image = f"{box_name.lower()}-boxbuddy-export:latest"
+    archive = os.path.join(
+        export_dir or os.path.expanduser("~"), f"{box_name}-export.tar"
+    )
+
+    commit_command = Command(
+        [*FLATPAK_SPAWN_ARR, manager, "container", "commit", box_name, image]
+    )
+    commit_command.run()
+    if not commit_command.succeeded:
+        return commit_command
+
+    command = Command([*FLATPAK_SPAWN_ARR, manager, "save", "-o", archive, image])
+    command.run()
+    command.stdout = f"{commit_command.stdout}{command.stdout}Saved to {archive}\n"
+
+    return command
+
+
+def create_box(
+    box_name: str, image: str, on_line: Optional[Callable[[str], None]] = None
+) -> Command:
+    """
+    Runs distrobox create, pulling the image if needed. on_line receives
+    each line of output, including the engine's pull progress on stderr,
+    on the main loop.
+    """
     cmd = f"distrobox create -i {image} -Y -n {box_name}"
 
-    run_command_and_get_output(cmd.split(" "))
+    command = Command(
+        [*FLATPAK_SPAWN_ARR, *cmd.split(" ")], on_line=on_line, merge_stderr=True
+    )
+    command.run()
+
+    return command
+
+
+def init_new_box(
+    box_name: str, on_line: Optional[Callable[[str], None]] = None
+) -> Command:
+    """
+    Enters the box once so distrobox's first-run setup happens now
+    rather than on the first terminal or app launch
+    """
+    cmd = f"setsid distrobox enter {box_name} -- ls"
+
+    command = Command(
+        [*FLATPAK_SPAWN_ARR, *cmd.split(" ")], on_line=on_line, merge_stderr=True
+    )
+    command.run()
+
+    return command
+
+
+class PullProgress:
+    """
+    Estimates image pull progress from podman or docker output by
+    counting layers started and finished
+    """
+
+    def __init__(self):
+        self.layers: set[str] = set()
+        self.finished_layers: set[str] = set()
+        self.complete = False
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if self.complete:
+            return 1.0
 
+        if not self.layers:
+            return None
 
-def init_new_box(box_name: str):
-    run_command_and_get_output(f"setsid distrobox enter {box_name} -- ls".split(" "))
+        return len(self.finished_layers) / len(self.layers)
+
+    def feed(self, line: str):
+        line = line.strip()
+
+        # podman: "Copying blob sha256:abc..." then "Copying blob abc done"
+        if line.startswith("Copying blob "):
+            parts = line.split()
+            layer = parts[2].split(":")[-1][:12]
+            self.layers.add(layer)
+
+            if parts[-1] in ("done", "skipped") or "already exists" in line:
+                self.finished_layers.add(layer)
+
+        # podman copies the config once every blob is done
+        elif line.startswith("Copying config "):
+            self.finished_layers |= self.layers
+
+        elif line.startswith("Writing manifest") or line.startswith("Digest: "):
+            self.complete = True
+
+        # docker: "abc123: Pulling fs layer" ... "abc123: Pull complete"
+        elif ": " in line:
+            layer, status = line.split(": ", 1)
+            if " " in layer or not layer:
+                return
+
+            if status in ("Pulling fs layer", "Waiting"):
+                self.layers.add(layer)
+            elif status in ("Pull complete", "Already exists"):
+                self.layers.add(layer)
+                self.finished_layers.add(layer)
+
+
+def get_distrobox_version() -> str:
+    return get_host_info().distrobox_version
+
+
+def get_cached_images() -> Optional[list[str]]:
+    """
+    Gets the image list from the last fetch, whatever its age or version
+    """
+    cached = read_json_cache("images.json")
+    if not isinstance(cached, dict):
+        return None
+
+    return cached.get("images")
 
 
 def get_available_images_with_distro_name():
+    """
+    Gets the images `distrobox create` knows about, cached for
+    IMAGES_CACHE_TTL per distrobox version
+    """
+    version = get_distrobox_version()
+
+    cached = read_json_cache("images.json")
+    if (
+        isinstance(cached, dict)
+        and cached.get("images")
+        and cached.get("version") == version
+        and time.time() - cached.get("fetched_at", 0) < IMAGES_CACHE_TTL
+    ):
+        return cached["images"]
+
+    imgs = fetch_available_images_with_distro_name()
+    if imgs:
+        write_json_cache(
+            "images.json",
+            {"version": version, "fetched_at": time.time(), "images": imgs},
+        )
+
+    return imgs
+
+
+def fetch_available_images_with_distro_name():
     out, err = run_command_and_get_output("distrobox create -C".split(" "))
 
     imgs = []
@@ -0,0 +1,78 @@
+import queue
+import threading
+from typing import Optional
+
+from settings import get_setting
+from shell_session import ShellSession
+from utils import is_flatpak
+
+# how many host shells may run commands at once
+BRIDGE_SESSIONS = 3
+
+HOST_PREFIX = ["flatpak-spawn", "--host"]
+
+
+class HostBridge:
+    """
+    A few shells on the host, started through flatpak-spawn once and then
+    reused, so each command doesn't pay for its own sandbox escape
+    """
+
+    def __init__(self, size: int = BRIDGE_SESSIONS):
+        self._all_sessions = [
+            ShellSession([*HOST_PREFIX, "sh"], trace=False) for _ in range(size)
+        ]
+
+        # most recently used first, so spare shells are left to go idle
+        self._sessions: queue.LifoQueue[ShellSession] = queue.LifoQueue()
+        for session in self._all_sessions:
+            self._sessions.put(session)
+
+    def run(self, command: list[str]) -> Optional[tuple[int, str, str]]:
+        """
+        Runs a host command, with or without the flatpak-spawn prefix.
+        Returns None if the bridge is broken, so the caller can spawn directly.
+        """
+        if command[: len(HOST_PREFIX)] == HOST_PREFIX:
+            command = command[len(HOST_PREFIX) :]
+
+        session = self._sessions.get()
+        try:
+            return session.try_run(command)
+        finally:
+            self._sessions.put(session)
+
+    def close(self):
+        """
+        Closes every shell, cutting short any command running in one
+        """
+        for session in self._all_sessions:
+            session.close()
+
+
+_host_bridge: Optional[HostBridge] = None
+_lock = threading.Lock()
+
+
+def get_host_bridge() -> Optional[HostBridge]:
+    """
+    Gets the shared bridge, or None outside flatpak or when turned off
+    """
+    global _host_bridge
+
+    if not is_flatpak() or not get_setting("host_bridge"):
+        return None
+
+    with _lock:
+        if _host_bridge is None:
+            _host_bridge = HostBridge()
+
+    return _host_bridge
+
+
+def close_host_bridge():
+    with _lock:
+        host_bridge = _host_bridge
+
+    if host_bridge is not None:
+        host_bridge.close()
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from cache import read_json_cache, write_json_cache
+from utils import run_command_and_get_output
+
+# terminal, and the arguments which make it run a command and not exit until
+# the command does, rather than handing it to an already running instance.
+# The last argument of each takes the rest of argv as the command and its
+# arguments, so e.g. tilix uses -x, as its -e takes a single string.
+TERMINALS = (
+    ("gnome-terminal", ["--wait", "--"]),
+    ("konsole", ["--separate", "-e"]),
+    ("xfce4-terminal", ["--disable-server", "-x"]),
+    ("tilix", ["--new-process", "-x"]),
+    ("alacritty", ["-e"]),
+    # GNOME Console can't be waited on, so terminals which can are preferred
+    ("kgx", ["--"]),
+    ("xterm", ["-e"]),
+)
+
+BINARIES = ("distrobox", "podman", "docker", *(name for name, _ in TERMINALS))
+
+# distrobox's config files, later ones overriding earlier ones
+DISTROBOX_CONFIGS = (
+    "/usr/share/distrobox/distrobox.conf",
+    "/usr/etc/distrobox/distrobox.conf",
+    "/etc/distrobox/distrobox.conf",
+    "${XDG_CONFIG_HOME:-$HOME/.config}/distrobox/distrobox.conf",
+    "$HOME/.distroboxrc",
+)
+
+# prints the host's PATH, the mtime of each dir on it, where each binary
+# is along with its mtime, and the container manager distrobox is set to
+# use, so a change to any of them changes the output
+PROBE_SCRIPT = f"""
+echo "PATH $PATH"
+IFS=:
+for dir in $PATH; do
+    echo "DIR $dir $(stat -L -c %Y "$dir" 2>/dev/null)"
+done
+unset IFS
+for name in "$@"; do
+    if path=$(command -v "$name"); then
+        echo "BIN $name $path $(stat -L -c %Y "$path" 2>/dev/null)"
+    fi
+done
+for conf in {" ".join(f'"{conf}"' for conf in DISTROBOX_CONFIGS)}; do
+    [ -f "$conf" ] || continue
+    grep "^[[:space:]]*container_manager=" "$conf" | sed "s/^/CONF /"
+done
+echo "ENV ${{DBX_CONTAINER_MANAGER:-}}"
+"""
+
+
+@dataclass
+class HostInfo:
+    fingerprint: str
+    binaries: dict[str, str]
+    distrobox_version: str
+    # from the host's environment or distrobox's config, "" if not set
+    configured_manager: str = ""
+
+    @property
+    def has_distrobox(self) -> bool:
+        return "distrobox" in self.binaries
+
+    @property
+    def container_manager(self) -> Optional[str]:
+        """
+        The engine distrobox will use, preferring podman like distrobox does
+        unless it is set to use another
+        """
+        candidates = ["podman", "docker"]
+
+        preferred = os.getenv("DBX_CONTAINER_MANAGER") or self.configured_manager
+        if preferred in candidates:
+            candidates = [preferred]
+
+        for candidate in candidates:
+            if candidate in self.binaries:
+                return candidate
+
+        return None
+
+    @property
+    def terminal(self) -> list[str]:
+        """
+        The start of a command which runs the rest of it in a terminal
+        """
+        for terminal, terminal_args in TERMINALS:
+            if terminal in self.binaries:
+                return [terminal, *terminal_args]
+
+        return ["konsole", "--separate", "-e"]
+
+
+_host_info: Optional[HostInfo] = None
+_lock = threading.Lock()
+
+
+def get_host_info() -> HostInfo:
+    """
+    Probes the host once per run. The distrobox version is reused from the
+    disk cache unless PATH, a dir on it, or a binary has changed since.
+    """
+    global _host_info
+
+    with _lock:
+        if _host_info is None:
+            _host_info = probe_host()
+
+    return _host_info
+
+
+def refresh_host_info() -> HostInfo:
+    global _host_info
+
+    with _lock:
+        _host_info = probe_host()
+
+    return _host_info
+
+
+def probe_host() -> HostInfo:
+    out, err = run_command_and_get_output(
+        ["sh", "-c", PROBE_SCRIPT, "sh", *BINARIES], bridge=True
+    )
+
+    binaries = {}
+    configured_manager = ""
+    env_manager = ""
+    for line in out.splitlines():
+        if line.startswith("BIN "):
+            parts = line.split(" ")
+            if len(parts) >= 3:
+                binaries[parts[1]] = parts[2]
+        elif line.startswith("CONF "):
+            configured_manager = parse_config_value(line.split("=", 1)[1])
+        elif line.startswith("ENV "):
+            env_manager = line[len("ENV ") :].strip()
+
+    fingerprint = hashlib.sha1(out.encode("utf-8")).hexdigest()
+
+    cached = read_json_cache("host.json")
+    if isinstance(cached, dict) and cached.get("fingerprint") == fingerprint:
+        try:
+            return HostInfo(**cached)
+        except TypeError:
+            pass
+
+    distrobox_version = ""
+    if "distrobox" in binaries:
+        version_out, version_err = run_command_and_get_output(
+            ["distrobox", "version"], bridge=True
+        )
+
+        # e.g. "distrobox: 1.5.0.2"
+        distrobox_version = version_out.strip().split(":")[-1].strip()
+
+    host_info = HostInfo(
+        fingerprint=fingerprint,
+        binaries=binaries,
+        distrobox_version=distrobox_version,
+        configured_manager=env_manager or configured_manager,
+    )
+    write_json_cache("host.json", asdict(host_info))
+
+    return host_info
+
+
+def parse_config_value(value: str) -> str:
+    """
+    Reads a value as distrobox's config files set it, e.g. "docker" # comment
+    """
+    value = value.split("#")[0].strip()
+
+    return value.strip("\"'")
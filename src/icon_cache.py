@@ -0,0 +1,209 @@
+import hashlib
+import os
+import threading
+from typing import Optional
+
+from cache import get_cache_dir, read_json_cache, remove_cache, write_json_cache
+
+# icons are stored at the size the Applications dialog shows them at
+ICON_SIZE = 64
+
+# least recently used icons are evicted once the cache is bigger than this
+CACHE_LIMIT_BYTES = 16 * 1024 * 1024
+
+_lock = threading.Lock()
+
+
+def get_icons_dir() -> str:
+    return get_cache_dir("icons", "files")
+
+
+def read_icon_index(container_id: str) -> tuple[str, dict[str, str]]:
+    """
+    Reads the apps fingerprint the box's icons were last looked for at, and
+    the file stored for each icon, "" meaning the box didn't have it
+    """
+    index = read_json_cache(f"{container_id}.json", "icons")
+    if not isinstance(index, dict) or not isinstance(index.get("icons"), dict):
+        return "", {}
+
+    return index.get("fingerprint", ""), index["icons"]
+
+
+def get_cached_icons(container_id: str) -> dict[str, str]:
+    """
+    Maps the box's icon names to their cached files, for icons which are
+    cached. Icons the box doesn't have are left out.
+    """
+    fingerprint, index = read_icon_index(container_id)
+
+    icons_dir = get_icons_dir()
+    cached_icons = {}
+    for icon, file_name in index.items():
+        path = os.path.join(icons_dir, file_name) if file_name else ""
+        if path and os.path.exists(path):
+            cached_icons[icon] = path
+
+    return cached_icons
+
+
+def get_uncached_icons(
+    container_id: str, icons: list[str], fingerprint: str
+) -> list[str]:
+    """
+    Finds which icons haven't been looked for in the box yet, or were
+    evicted since, marking the rest as recently used. Icons the box didn't
+    have are looked for again once its apps have changed.
+    """
+    known_fingerprint, index = read_icon_index(container_id)
+
+    icons_dir = get_icons_dir()
+    uncached = []
+    for icon in dict.fromkeys(icons):
+        if icon not in index:
+            uncached.append(icon)
+            continue
+
+        if not index[icon]:
+            if known_fingerprint != fingerprint:
+                uncached.append(icon)
+            continue
+
+        try:
+            os.utime(os.path.join(icons_dir, index[icon]))
+        except OSError:
+            uncached.append(icon)
+
+    return uncached
+
+
+def store_icons(
+    container_id: str,
+    fingerprint: str,
+    icons: list[str],
+    paths: list[str],
+    files: dict[str, bytes],
+) -> dict[str, str]:
+    """
+    Stores the icons found in the box at its apps fingerprint, paths[i]
+    being the file found for icons[i] or "" if there was none, and files
+    their contents. Each icon is scaled down and saved under the hash of
+    its content, so boxes sharing an icon share its file. Returns the
+    box's cached icons.
+    """
+    icons_dir = get_icons_dir()
+
+    with _lock:
+        known_fingerprint, index = read_icon_index(container_id)
+
+        # icons the box didn't have may have been installed since
+        if known_fingerprint != fingerprint:
+            index = {icon: file_name for icon, file_name in index.items() if file_name}
+
+        for icon, path in zip(icons, paths):
+            if not path:
+                index[icon] = ""
+                continue
+
+            # left uncached to be tried again, e.g. if the copy was cut short
+            data = files.get(path)
+            if data is None:
+                continue
+
+            extension = os.path.splitext(path)[1].lower()
+            thumbnail = make_thumbnail(data)
+            if thumbnail is not None:
+                data, extension = thumbnail, ".png"
+
+            file_name = f"{hashlib.sha256(data).hexdigest()}{extension}"
+            file_path = os.path.join(icons_dir, file_name)
+
+            # another box may have stored the same icon already
+            try:
+                os.utime(file_path)
+            except OSError:
+                if not write_icon(file_path, data):
+                    continue
+
+            index[icon] = file_name
+
+        write_json_cache(
+            f"{container_id}.json",
+            {"fingerprint": fingerprint, "icons": index},
+            "icons",
+        )
+        evict_icons(icons_dir)
+
+    return get_cached_icons(container_id)
+
+
+def make_thumbnail(data: bytes) -> Optional[bytes]:
+    """
+    Scales an icon down to ICON_SIZE as a png. Returns None when GdkPixbuf
+    isn't available or can't load the icon, e.g. from the cli.
+    """
+    try:
+        import gi
+
+        gi.require_version("GdkPixbuf", "2.0")
+        from gi.repository import GdkPixbuf, Gio, GLib
+    except (ImportError, ValueError):
+        return None
+
+    try:
+        stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+        pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
+            stream, ICON_SIZE, ICON_SIZE, True, None
+        )
+        saved, buffer = pixbuf.save_to_bufferv("png", [], [])
+    except GLib.Error:
+        return None
+
+    return bytes(buffer) if saved else None
+
+
+def write_icon(path: str, data: bytes) -> bool:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+
+    return True
+
+
+def evict_icons(icons_dir: str):
+    """
+    Removes the least recently used icons until the cache fits its limit.
+    Box indexes pointing at removed icons see them as uncached.
+    """
+    entries = []
+    total_size = 0
+
+    for file_name in os.listdir(icons_dir):
+        try:
+            stat = os.stat(os.path.join(icons_dir, file_name))
+        except OSError:
+            continue
+
+        entries.append((stat.st_mtime, stat.st_size, file_name))
+        total_size += stat.st_size
+
+    for mtime, size, file_name in sorted(entries):
+        if total_size <= CACHE_LIMIT_BYTES:
+            break
+
+        try:
+            os.remove(os.path.join(icons_dir, file_name))
+        except OSError:
+            continue
+
+        total_size -= size
+
+
+def drop_icon_cache(container_id: str):
+    remove_cache(f"{container_id}.json", "icons")
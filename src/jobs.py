@@ -0,0 +1,366 @@
+import threading
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import tracing
+from command_runner import Command, dispatch, set_command_observer
+
+QUEUED = "Queued"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
+
+@dataclass
+class BatchResult:
+    box_name: str
+    succeeded: bool
+    log: str
+
+
+class Batch:
+    """
+    A set of jobs running the same action over several boxes, at most
+    `limit` at a time
+    """
+
+    def __init__(
+        self,
+        title: str,
+        limit: int,
+        total: int,
+        on_result: Optional[Callable[[BatchResult], Any]] = None,
+        on_finished: Optional[Callable[["Batch"], Any]] = None,
+    ):
+        self.title = title
+        self.limit = max(1, limit)
+        self.total = total
+        self.on_result = on_result
+        self.on_finished = on_finished
+
+        self.running = 0
+        self.results: list[BatchResult] = []
+
+    @property
+    def finished(self) -> bool:
+        return len(self.results) == self.total
+
+    @property
+    def failures(self) -> list[BatchResult]:
+        return [result for result in self.results if not result.succeeded]
+
+
+class Job:
+    """
+    A unit of background work, optionally tied to a box. Jobs for the
+    same box never run at the same time.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        func: Callable,
+        args: tuple,
+        box_name: Optional[str] = None,
+        key: Optional[str] = None,
+        batch: Optional[Batch] = None,
+    ):
+        self.title = title
+        self.func = func
+        self.args = args
+        self.box_name = box_name
+        self.key = key
+        self.batch = batch
+
+        self.state = QUEUED
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+
+        self._done_callbacks: list[Callable] = []
+        self._error_callbacks: list[Callable] = []
+        self._commands: list[Command] = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.state == CANCELLED
+
+    def add_callbacks(
+        self,
+        on_done: Optional[Callable] = None,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+    ):
+        if on_done:
+            self._done_callbacks.append(on_done)
+        if on_error:
+            self._error_callbacks.append(on_error)
+
+    def cancel(self):
+        """
+        Cancels the job, terminating any command it is running
+        """
+        with self._lock:
+            if self.finished:
+                return
+
+            self.state = CANCELLED
+            for command in self._commands:
+                command.cancel()
+
+    def _track_command(self, command: Command):
+        with self._lock:
+            self._commands.append(command)
+            if self.cancelled:
+                command.cancel()
+
+    def _run(self):
+        set_command_observer(self._track_command)
+        tracing.set_action(self.title)
+
+        try:
+            result = self.func(*self.args)
+        except Exception as e:
+            traceback.print_exc()
+            self.error = e
+            if not self.cancelled:
+                self.state = FAILED
+        else:
+            self.result = result
+            if not self.cancelled:
+                self.state = DONE
+        finally:
+            set_command_observer(None)
+            tracing.set_action(None)
+
+        if self.state == DONE:
+            for callback in self._done_callbacks:
+                dispatch(callback, self.result)
+        elif self.state == FAILED:
+            for callback in self._error_callbacks:
+                dispatch(callback, self.error)
+
+
+class JobScheduler:
+    """
+    Runs jobs on a bounded pool of worker threads, serialising jobs for
+    the same box. Listeners are told about every state change on the main loop.
+    """
+
+    def __init__(self, max_workers: int = 3, history: int = 30):
+        self.max_workers = max_workers
+        self.history = history
+        self.jobs: deque[Job] = deque()
+        self.listeners: list[Callable[[Job], Any]] = []
+
+        self._queue: deque[Job] = deque()
+        self._busy_boxes: set[str] = set()
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+
+    def submit(
+        self,
+        title: str,
+        func: Callable,
+        *args,
+        box_name: Optional[str] = None,
+        key: Optional[str] = None,
+        on_done: Optional[Callable] = None,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+        batch: Optional[Batch] = None,
+        detached: bool = False,
+    ) -> Job:
+        """
+        Queues func(*args). If an unfinished job with the same key exists,
+        the callbacks are added to that job instead of starting another.
+
+        A detached job runs on its own thread rather than a worker, for long
+        interactive work like an upgrade in a terminal. It still holds its
+        box, so other jobs for that box wait for it.
+        """
+        with self._condition:
+            if key:
+                for job in self.jobs:
+                    if job.key == key and not job.finished:
+                        job.add_callbacks(on_done, on_error)
+                        return job
+
+            job = Job(title, func, args, box_name=box_name, key=key, batch=batch)
+            job.add_callbacks(on_done, on_error)
+
+            self.jobs.append(job)
+            self._trim_history()
+
+            if detached:
+                threading.Thread(
+                    target=self._work_detached, args=(job,), daemon=True
+                ).start()
+            else:
+                self._queue.append(job)
+
+                # a batch gets enough workers to reach its own limit
+                worker_limit = max(self.max_workers, batch.limit if batch else 0)
+                if len(self._workers) < worker_limit:
+                    worker = threading.Thread(target=self._work, daemon=True)
+                    self._workers.append(worker)
+                    worker.start()
+
+                self._condition.notify()
+
+        self._notify(job)
+
+        return job
+
+    def submit_batch(
+        self,
+        title: str,
+        func: Callable[[str], Any],
+        box_names: list[str],
+        limit: int,
+        on_result: Optional[Callable[[BatchResult], Any]] = None,
+        on_finished: Optional[Callable[[Batch], Any]] = None,
+    ) -> Batch:
+        """
+        Runs func(box_name) for each box, `limit` at a time. func returns a
+        finished Command, whose output becomes that box's log.
+        """
+        batch = Batch(title, limit, len(box_names), on_result, on_finished)
+
+        def run_for_box(box_name: str) -> BatchResult:
+            try:
+                command = func(box_name)
+            except Exception as e:
+                return BatchResult(box_name, False, str(e))
+
+            return BatchResult(
+                box_name,
+                command.succeeded,
+                f"{command.stdout}{command.stderr}",
+            )
+
+        for box_name in box_names:
+            self.submit(
+                f"{title} {box_name}",
+                run_for_box,
+                box_name,
+                box_name=box_name,
+                batch=batch,
+            )
+
+        return batch
+
+    def cancel(self, job: Job):
+        with self._condition:
+            queued = job in self._queue
+            if queued:
+                self._queue.remove(job)
+
+            job.cancel()
+
+            # a queued job never reaches a worker, so record it here
+            if queued and job.batch:
+                self._record_batch_result(job)
+
+            # wakes a detached job waiting for its box
+            self._condition.notify_all()
+
+        self._notify(job)
+
+    def _trim_history(self):
+        """
+        Forgets the oldest finished jobs beyond the history limit. Unfinished
+        jobs are always kept, so they can still be cancelled and coalesced.
+        """
+        excess = len(self.jobs) - self.history
+        if excess <= 0:
+            return
+
+        for job in [job for job in self.jobs if job.finished][:excess]:
+            self.jobs.remove(job)
+
+    def has_running_jobs(self) -> bool:
+        return any(not job.finished for job in self.jobs)
+
+    def _next_job(self) -> Job:
+        with self._condition:
+            while True:
+                for job in list(self._queue):
+                    if job.cancelled:
+                        self._queue.remove(job)
+                        if job.batch:
+                            self._record_batch_result(job)
+                        continue
+
+                    if job.batch and job.batch.running >= job.batch.limit:
+                        continue
+
+                    if job.box_name is None or job.box_name not in self._busy_boxes:
+                        self._queue.remove(job)
+                        if job.box_name:
+                            self._busy_boxes.add(job.box_name)
+                        if job.batch:
+                            job.batch.running += 1
+                        job.state = RUNNING
+                        return job
+
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            self._notify(job)
+
+            job._run()
+            self._finish_job(job)
+
+    def _work_detached(self, job: Job):
+        with self._condition:
+            while not job.cancelled and job.box_name in self._busy_boxes:
+                self._condition.wait()
+
+            if job.cancelled:
+                return
+
+            if job.box_name:
+                self._busy_boxes.add(job.box_name)
+            job.state = RUNNING
+
+        self._notify(job)
+
+        job._run()
+        self._finish_job(job)
+
+    def _finish_job(self, job: Job):
+        with self._condition:
+            self._busy_boxes.discard(job.box_name)
+            if job.batch:
+                job.batch.running -= 1
+                self._record_batch_result(job)
+            self._condition.notify_all()
+
+        self._notify(job)
+
+    def _record_batch_result(self, job: Job):
+        batch = job.batch
+
+        if isinstance(job.result, BatchResult):
+            result = job.result
+        else:
+            result = BatchResult(job.box_name, False, job.state)
+
+        batch.results.append(result)
+        if batch.on_result:
+            dispatch(batch.on_result, result)
+
+        if batch.finished and batch.on_finished:
+            dispatch(batch.on_finished, batch)
+
+    def _notify(self, job: Job):
+        for listener in self.listeners:
+            dispatch(listener, job)
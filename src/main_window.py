@@ -1,32 +1,147 @@
-import os
-import subprocess
 import gi
 
+from dataclasses import dataclass, replace
 from functools import partial
-from threading import Thread
+from typing import Optional
 
+from command_runner import Command, dispatch, run_in_background, set_dispatcher
 from distrobox_handler import (
+    AppExportResult,
+    BoxEvent,
     Distrobox,
+    close_box_sessions,
+    LocalApp,
+    PullProgress,
     create_box,
     delete_box,
+    get_all_distroboxes,
     get_apps_in_box,
-    export_app_from_box,
+    export_apps_from_box,
+    extract_icons_from_box,
     get_available_images_with_distro_name,
+    get_cached_apps_in_box,
+    get_cached_images,
+    get_exported_apps,
+    init_new_box,
+    launch_app_in_box,
+    load_box_snapshot,
+    export_box_image,
     open_terminal_in_box,
-    run_command_in_box,
+    remove_box,
+    save_box_snapshot,
+    stop_box,
     upgrade_box,
+    upgrade_box_headless,
+    watch_box_events,
 )
-from utils import get_distro_img, has_distrobox_installed
+from host_bridge import close_host_bridge
+from icon_cache import get_cached_icons
+from jobs import Batch, BatchResult, Job, JobScheduler
+from resource_monitor import SAMPLE_INTERVAL_SECONDS, ResourceMonitor
+from settings import get_setting, set_setting
+import startup_timing
+import tracing
+from utils import (
+    format_size,
+    get_distro_img,
+    get_warm_img,
+    has_distrobox_installed,
+    is_flatpak,
+)
+from warm_pool import WarmPool, is_running, is_warm_box, set_warm_box
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import GObject, Gtk, Gio, GLib, Adw, GdkPixbuf
+from gi.repository import Gtk, Gdk, Gio, GLib, GObject, Adw, Pango
+
+# engine events which change a box's status without adding or removing it
+EVENT_STATUSES = {
+    "start": "Up",
+    "restart": "Up",
+    "unpause": "Up",
+    "pause": "Paused",
+    "died": "Exited",
+    "die": "Exited",
+    "stop": "Exited",
+}
+
+# engine events which change the set of boxes
+EVENT_RELOADS = ("create", "remove", "destroy", "rename")
+
+
+class BoxItem(GObject.Object):
+    """
+    A box in the sidebar's list model
+    """
+
+    def __init__(self, box: Distrobox, stale: bool):
+        super().__init__()
+        self.box = box
+        self.stale = stale
+
+
+class AppItem(GObject.Object):
+    """
+    An app in the applications dialog's list model
+    """
+
+    def __init__(self, app: LocalApp):
+        super().__init__()
+        self.app = app
+
+
+class TraceItem(GObject.Object):
+    """
+    A finished command in the debug panel's list model
+    """
+
+    def __init__(self, trace: tracing.CommandTrace):
+        super().__init__()
+        self.trace = trace
+
+
+@dataclass
+class BoxPage:
+    box: Distrobox
+    page: Gtk.Box
+    page_status: Gtk.Label
+    stats_row: Adw.ActionRow
+    sparkline: Gtk.DrawingArea
+
+    def needs_rebuild(self, box: Distrobox) -> bool:
+        """
+        Whether anything other than the status changed
+        """
+        return (
+            self.box.name != box.name
+            or self.box.distro != box.distro
+            or self.box.image_url != box.image_url
+        )
 
 
 class MainWindow(Gtk.ApplicationWindow):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        set_dispatcher(GLib.idle_add)
+
+        self.jobs = JobScheduler(max_workers=3)
+        self.jobs.listeners.append(self.on_job_changed)
+
+        # hidden panel listing every command run, toggled with Ctrl+Shift+D
+        self.debug_popup = None
+        self.trace_store = None
+        tracing.listeners.append(lambda trace: dispatch(self.on_command_traced, trace))
+
+        debug_shortcut = Gtk.ShortcutController()
+        debug_shortcut.add_shortcut(
+            Gtk.Shortcut(
+                trigger=Gtk.ShortcutTrigger.parse_string("<Control><Shift>d"),
+                action=Gtk.CallbackAction.new(self.show_debug_panel),
+            )
+        )
+        self.add_controller(debug_shortcut)
+
         self.set_default_size(800, 450)
 
         self.make_titlebar()
@@ -45,14 +160,78 @@ class MainWindow(Gtk.ApplicationWindow):
 
         self.set_child(self.toast_overlay)
 
+        self.box_store = None
+        self.box_pages: dict[str, BoxPage] = {}
+
+        self.warm_pool = WarmPool(self.jobs)
+        self.warmed_up = False
+
+        # box resources are only sampled while the window is shown
+        self.resource_monitor = ResourceMonitor()
+        self.stats_timer = None
+        self.stats_sampling = False
+
+        self.event_watcher = None
+        self.event_reload_pending = False
+
+        # only the shell is built here, everything else waits for the first frame
+        self.started = False
+        self.render_loading_message()
+
+        self.connect("map", self.on_window_mapped)
+        self.connect("unmap", self.on_window_unmapped)
+        self.connect("close-request", self.on_close_request)
+
+    def on_first_frame(self, frame_clock, handler_id: int):
+        frame_clock.disconnect(handler_id)
+        startup_timing.mark("first frame")
+
+        GLib.idle_add(self.start_up)
+
+    def start_up(self):
+        """
+        Loads boxes and starts background work, once the shell is on screen
+        """
+        self.started = True
+
+        # show the last known boxes straight away, then refresh them
+        snapshot = load_box_snapshot()
+        if snapshot:
+            self.on_boxes_loaded(snapshot, stale=True)
+            startup_timing.mark("snapshot rendered")
+
         self.load_boxes()
 
+        run_in_background(
+            watch_box_events,
+            self.on_box_event,
+            self.on_event_watcher_stopped,
+            on_done=self.on_event_watcher_started,
+        )
+
+        GLib.timeout_add_seconds(60, self.on_idle_check)
+
+        if self.get_mapped():
+            self.start_stats_sampling()
+
+        return False
+
     def make_titlebar(self):
         add_btn = Gtk.Button()
         add_btn.set_icon_name("list-add-symbolic")
         add_btn.connect("clicked", self.create_box)
         add_btn.set_tooltip_text("Create A Distrobox")
 
+        batch_btn = Gtk.Button()
+        batch_btn.set_icon_name("edit-select-all-symbolic")
+        batch_btn.connect("clicked", self.show_batch_popup)
+        batch_btn.set_tooltip_text("Batch Actions")
+
+        prefs_btn = Gtk.Button()
+        prefs_btn.set_icon_name("preferences-system-symbolic")
+        prefs_btn.connect("clicked", self.show_preferences_popup)
+        prefs_btn.set_tooltip_text("Preferences")
+
         about_btn = Gtk.Button()
         about_btn.set_icon_name("help-about-symbolic")
         about_btn.connect("clicked", self.show_about_popup)
@@ -64,56 +243,484 @@ class MainWindow(Gtk.ApplicationWindow):
         self.titlebar = Adw.HeaderBar()
         self.titlebar.set_title_widget(title_lbl)
         self.titlebar.pack_start(add_btn)
+        self.titlebar.pack_start(batch_btn)
         self.titlebar.pack_end(about_btn)
+        self.titlebar.pack_end(prefs_btn)
+        self.titlebar.pack_end(self.make_jobs_button())
 
         self.set_titlebar(self.titlebar)
 
+    def make_jobs_button(self) -> Gtk.MenuButton:
+        """
+        Makes the titlebar button showing running and recent jobs
+        """
+        self.jobs_list = Gtk.ListBox()
+        self.jobs_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        self.jobs_list.add_css_class("boxed-list")
+        self.jobs_list.set_placeholder(Gtk.Label(label="No Jobs"))
+
+        jobs_scroll = Gtk.ScrolledWindow()
+        jobs_scroll.set_propagate_natural_height(True)
+        jobs_scroll.set_max_content_height(400)
+        jobs_scroll.set_min_content_width(350)
+        jobs_scroll.set_child(self.jobs_list)
+
+        jobs_popover = Gtk.Popover()
+        jobs_popover.set_child(jobs_scroll)
+
+        self.jobs_btn = Gtk.MenuButton()
+        self.jobs_btn.set_icon_name("view-list-bullet-symbolic")
+        self.jobs_btn.set_popover(jobs_popover)
+        self.jobs_btn.set_tooltip_text("Jobs")
+
+        return self.jobs_btn
+
+    def on_job_changed(self, job: Job):
+        """
+        Re-renders the jobs list, newest first
+        """
+        while row := self.jobs_list.get_first_child():
+            self.jobs_list.remove(row)
+
+        for job in reversed(self.jobs.jobs):
+            job_row = Adw.ActionRow()
+            job_row.set_title(job.title)
+            job_row.set_subtitle(job.state)
+
+            if not job.finished:
+                job_spinner = Gtk.Spinner()
+                job_spinner.start()
+                job_row.add_prefix(job_spinner)
+
+                cancel_btn = Gtk.Button()
+                cancel_btn.set_icon_name("process-stop-symbolic")
+                cancel_btn.set_tooltip_text("Cancel")
+                cancel_btn.set_valign(Gtk.Align.CENTER)
+                cancel_btn.add_css_class("flat")
+                cancel_btn.connect("clicked", lambda s, j=job: self.jobs.cancel(j))
+                job_row.add_suffix(cancel_btn)
+
+            self.jobs_list.append(job_row)
+
+        if self.jobs.has_running_jobs():
+            self.jobs_btn.set_icon_name("emblem-synchronizing-symbolic")
+        else:
+            self.jobs_btn.set_icon_name("view-list-bullet-symbolic")
+
     def load_boxes(self):
         """
-        Loads tab for each box
+        Fetches boxes in the background, then loads tab for each box
         """
-        from distrobox_handler import get_all_distroboxes
 
-        distrobox_installed = has_distrobox_installed()
-        if not distrobox_installed:
-            return self.render_not_installed_message()
+        def bg_func():
+            if not has_distrobox_installed():
+                return None
 
-        boxes = get_all_distroboxes()
+            boxes = get_all_distroboxes()
+            save_box_snapshot(boxes)
+
+            return boxes
+
+        run_in_background(bg_func, on_done=self.on_boxes_loaded)
+
+    def on_boxes_loaded(self, boxes: list[Distrobox] | None, stale: bool = False):
+        """
+        Renders boxes. Stale boxes come from the snapshot and are marked
+        as such until the refresh replaces them.
+        """
+        if not stale:
+            startup_timing.mark("boxes loaded")
+
+        if boxes is None:
+            return self.render_not_installed_message()
 
         if len(boxes) == 0:
             return self.render_no_boxes_message()
 
-        tabs = Gtk.Notebook()
-        tabs.set_tab_pos(Gtk.PositionType.LEFT)
-        tabs.set_hexpand(True)
-        tabs.set_vexpand(True)
+        if not stale and not self.warmed_up:
+            self.warmed_up = True
+            self.warm_pool.warm_up(boxes)
 
-        for box in boxes:
-            tab = self.make_box_tab(box)
-            tab.set_hexpand(True)
-            tab.set_vexpand(True)
+        if self.box_store is None:
+            self.clear_main_box()
+            self.main_box.append(self.make_box_view())
+
+        self.reconcile_box_items(boxes, stale)
+
+    def make_box_view(self) -> Gtk.Box:
+        """
+        Makes the filterable sidebar of boxes and the stack of box pages.
+        Sidebar rows are recycled by the ListView, and pages are only
+        built when their box is first selected.
+        """
+        self.box_store = Gio.ListStore(item_type=BoxItem)
+
+        self.box_filter = Gtk.CustomFilter.new(self.filter_box_item)
+        box_filter_model = Gtk.FilterListModel(
+            model=self.box_store, filter=self.box_filter
+        )
+
+        self.box_selection = Gtk.SingleSelection(model=box_filter_model)
+        self.box_selection.connect("notify::selected-item", self.on_box_selected)
+
+        box_factory = Gtk.SignalListItemFactory()
+        box_factory.connect("setup", self.on_box_row_setup)
+        box_factory.connect("bind", self.on_box_row_bind)
+
+        box_list = Gtk.ListView(model=self.box_selection, factory=box_factory)
+        box_list.add_css_class("navigation-sidebar")
+
+        box_list_scroll = Gtk.ScrolledWindow()
+        box_list_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        box_list_scroll.set_vexpand(True)
+        box_list_scroll.set_child(box_list)
+
+        self.box_search = Gtk.SearchEntry()
+        self.box_search.set_placeholder_text("Filter by name, distro or status")
+        self.box_search.connect(
+            "search-changed",
+            lambda s: self.box_filter.changed(Gtk.FilterChange.DIFFERENT),
+        )
+
+        sidebar = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        sidebar.set_spacing(5)
+        sidebar.set_size_request(220, -1)
+        sidebar.append(self.box_search)
+        sidebar.append(box_list_scroll)
+
+        self.box_stack = Gtk.Stack()
+        self.box_stack.set_hexpand(True)
+        self.box_stack.set_vexpand(True)
+
+        box_view = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        box_view.set_spacing(10)
+        box_view.set_vexpand(True)
+        box_view.append(sidebar)
+        box_view.append(Gtk.Separator(orientation=Gtk.Orientation.VERTICAL))
+        box_view.append(self.box_stack)
+
+        return box_view
+
+    def filter_box_item(self, item: BoxItem) -> bool:
+        query = self.box_search.get_text().strip().lower()
+        if not query:
+            return True
+
+        box = item.box
+        return any(
+            query in field.lower() for field in (box.name, box.distro, box.status)
+        )
+
+    def on_box_row_setup(self, factory, list_item):
+        row_img = Gtk.Label()
+
+        row_name = Gtk.Label()
+        row_name.set_xalign(0)
+        row_name.set_hexpand(True)
+        row_name.set_ellipsize(Pango.EllipsizeMode.END)
+
+        row_warm = Gtk.Label()
+
+        row = Gtk.Box()
+        row.set_spacing(5)
+        row.append(row_img)
+        row.append(row_name)
+        row.append(row_warm)
+
+        list_item.set_child(row)
+
+    def on_box_row_bind(self, factory, list_item):
+        item = list_item.get_item()
+        row_img = list_item.get_child().get_first_child()
+        row_name = row_img.get_next_sibling()
+        row_warm = row_name.get_next_sibling()
+
+        row_img.set_markup(get_distro_img(item.box.distro))
+
+        row_name.set_label(item.box.name)
+        if item.stale:
+            row_name.add_css_class("dim-label")
+        else:
+            row_name.remove_css_class("dim-label")
+
+        running = is_running(item.box)
+        row_warm.set_markup(get_warm_img(running))
+        row_warm.set_tooltip_text("Warm (running)" if running else "Cold (stopped)")
+
+    def on_box_selected(self, *args):
+        item = self.box_selection.get_selected_item()
+        if item is None:
+            return
+
+        self.show_box_page(item.box, item.stale)
+
+    def show_box_page(self, box: Distrobox, stale: bool):
+        """
+        Shows the box's page, building it the first time
+        """
+        if box.container_id not in self.box_pages:
+            box_page = self.make_box_tab(box, stale)
+            box_page.page.set_hexpand(True)
+            box_page.page.set_vexpand(True)
+
+            self.box_stack.add_named(box_page.page, box.container_id)
+            self.box_pages[box.container_id] = box_page
+            self.update_box_page_stats(box_page)
+
+        self.box_stack.set_visible_child_name(box.container_id)
+
+    def get_boxes(self) -> list[Distrobox]:
+        if self.box_store is None:
+            return []
+
+        return [item.box for item in self.box_store]
+
+    def find_box_position(self, container_id: str, start: int = 0) -> Optional[int]:
+        for position in range(start, self.box_store.get_n_items()):
+            if self.box_store.get_item(position).box.container_id == container_id:
+                return position
+
+        return None
+
+    def reconcile_box_items(self, boxes: list[Distrobox], stale: bool):
+        """
+        Diffs boxes against the list model by container id, only touching
+        items and pages which were added, removed or changed
+        """
+        new_ids = {box.container_id for box in boxes}
 
-            tab_title = Gtk.Box()
-            tab_title.set_spacing(5)
+        for position in reversed(range(self.box_store.get_n_items())):
+            container_id = self.box_store.get_item(position).box.container_id
+            if container_id not in new_ids:
+                self.box_store.remove(position)
+                self.drop_box_page(container_id)
 
-            tab_title_label = Gtk.Label(label=box.name)
+        for position, box in enumerate(boxes):
+            existing = self.find_box_position(box.container_id, position)
 
-            tab_title_img = Gtk.Label()
-            tab_title_img.set_markup(get_distro_img(box.distro))
+            if existing is None:
+                self.box_store.insert(position, BoxItem(box, stale))
+            elif existing != position:
+                self.box_store.remove(existing)
+                self.box_store.insert(position, BoxItem(box, stale))
+            else:
+                item = self.box_store.get_item(position)
+                if item.box == box and item.stale == stale:
+                    continue
 
-            tab_title.append(tab_title_img)
-            tab_title.append(tab_title_label)
+                self.box_store.splice(position, 1, [BoxItem(box, stale)])
 
-            tabs.append_page(tab, tab_title)
+            self.update_box_page(box, stale)
 
+    def update_box(self, box: Distrobox):
+        """
+        Replaces one box's item and page in place
+        """
+        position = self.find_box_position(box.container_id)
+        if position is None:
+            return
+
+        self.box_store.splice(position, 1, [BoxItem(box, False)])
+        self.update_box_page(box, False)
+
+    def update_box_page(self, box: Distrobox, stale: bool):
+        """
+        Updates the status of a built page in place, or drops the page
+        to be rebuilt if anything else changed
+        """
+        box_page = self.box_pages.get(box.container_id)
+        if box_page is None:
+            return
+
+        if box_page.needs_rebuild(box):
+            was_visible = self.box_stack.get_visible_child() == box_page.page
+            self.drop_box_page(box.container_id)
+
+            if was_visible:
+                self.show_box_page(box, stale)
+
+            return
+
+        box_page.box = box
+
+        if stale:
+            box_page.page_status.set_label(f"{box.status} (refreshing...)")
+            box_page.page_status.add_css_class("dim-label")
+        else:
+            box_page.page_status.set_label(box.status)
+            box_page.page_status.remove_css_class("dim-label")
+
+    def drop_box_page(self, container_id: str):
+        box_page = self.box_pages.pop(container_id, None)
+        if box_page:
+            self.box_stack.remove(box_page.page)
+
+    def clear_main_box(self):
         while child := self.main_box.get_first_child():
             self.main_box.remove(child)
 
-        self.main_box.append(tabs)
+        self.box_store = None
+        self.box_pages = {}
+
+    def on_event_watcher_started(self, watcher):
+        self.event_watcher = watcher
+
+    def on_event_watcher_stopped(self, watcher):
+        # fall back to reloading after our own actions
+        self.event_watcher = None
+
+    def on_box_event(self, event: BoxEvent):
+        """
+        Applies a container engine event to the box pages
+        """
+        box = next(
+            (box for box in self.get_boxes() if box.container_id == event.container_id),
+            None,
+        )
+
+        if event.action in EVENT_STATUSES and box:
+            self.update_box(replace(box, status=EVENT_STATUSES[event.action]))
+        elif event.action in EVENT_RELOADS or event.action in EVENT_STATUSES:
+            # one action emits a burst of events, so only reload once
+            if not self.event_reload_pending:
+                self.event_reload_pending = True
+                GLib.timeout_add(250, self.on_event_reload)
+
+    def on_event_reload(self):
+        self.event_reload_pending = False
+        self.load_boxes()
+
+        return False
+
+    def on_idle_check(self):
+        self.warm_pool.check_idle(self.get_boxes())
+
+        return True
+
+    def on_window_mapped(self, *args):
+        if self.started:
+            self.start_stats_sampling()
+            return
+
+        frame_clock = self.get_frame_clock()
+        handler_id = None
+
+        def on_after_paint(frame_clock):
+            self.on_first_frame(frame_clock, handler_id)
+
+        handler_id = frame_clock.connect("after-paint", on_after_paint)
+
+    def start_stats_sampling(self):
+        if self.stats_timer is None:
+            self.stats_timer = GLib.timeout_add_seconds(
+                SAMPLE_INTERVAL_SECONDS, self.on_stats_tick
+            )
+            self.on_stats_tick()
+
+    def on_window_unmapped(self, *args):
+        if self.stats_timer is not None:
+            GLib.source_remove(self.stats_timer)
+            self.stats_timer = None
+
+    def on_stats_tick(self):
+        """
+        Samples all running boxes, unless the window is minimised or the
+        last sample is still running. Sampling bypasses the job scheduler
+        so it doesn't flood the jobs panel.
+        """
+        surface = self.get_surface()
+        minimised = surface is not None and bool(
+            surface.get_state() & Gdk.ToplevelState.MINIMIZED
+        )
+
+        if minimised or self.stats_sampling or not self.get_boxes():
+            return True
+
+        self.stats_sampling = True
+        run_in_background(
+            self.resource_monitor.sample,
+            self.get_boxes(),
+            on_done=self.on_stats_sampled,
+            on_error=self.on_stats_sampled,
+        )
+
+        return True
+
+    def on_stats_sampled(self, *args):
+        self.stats_sampling = False
+
+        for box_page in self.box_pages.values():
+            self.update_box_page_stats(box_page)
+
+    def update_box_page_stats(self, box_page: BoxPage):
+        stats = self.resource_monitor.get_latest(box_page.box.container_id)
+
+        if stats is None:
+            box_page.stats_row.set_subtitle("Not running")
+        else:
+            box_page.stats_row.set_subtitle(
+                f"CPU {stats.cpu_percent:.1f}%"
+                f" · Memory {format_size(stats.mem_bytes)}"
+                f" ({stats.mem_percent:.1f}%)"
+                f" · {stats.pids} processes"
+                f" · Disk {format_size(stats.block_read_bytes)} read,"
+                f" {format_size(stats.block_write_bytes)} written"
+            )
+
+        box_page.sparkline.queue_draw()
+
+    def draw_sparkline(self, container_id: str, area, cr, width, height):
+        """
+        Draws the box's CPU history, newest sample on the right
+        """
+        values = [
+            stats.cpu_percent
+            for stats in self.resource_monitor.get_history(container_id)
+        ]
+        if len(values) < 2:
+            return
+
+        # keep idle noise flat rather than scaling it up to full height
+        top = max(10.0, max(values))
+        step = width / (self.resource_monitor.history_length - 1)
+        start_x = width - step * (len(values) - 1)
+
+        colour = area.get_color()
+        cr.set_source_rgba(colour.red, colour.green, colour.blue, colour.alpha)
+        cr.set_line_width(1.5)
+
+        for index, value in enumerate(values):
+            x = start_x + step * index
+            y = height - 1 - (height - 2) * value / top
+            if index == 0:
+                cr.move_to(x, y)
+            else:
+                cr.line_to(x, y)
+
+        cr.stroke()
+
+    def on_close_request(self, *args):
+        if self.event_watcher:
+            self.event_watcher.cancel()
+
+        # sessions may be mid-command, which mustn't hold up closing
+        run_in_background(close_box_sessions)
+        run_in_background(close_host_bridge)
+
+        return False
+
+    def render_loading_message(self):
+        self.clear_main_box()
+
+        loading_spinner = Gtk.Spinner()
+        loading_spinner.set_vexpand(True)
+        loading_spinner.set_size_request(32, 32)
+        loading_spinner.start()
+
+        self.main_box.append(loading_spinner)
 
     def render_no_boxes_message(self):
-        while child := self.main_box.get_first_child():
-            self.main_box.remove(child)
+        self.clear_main_box()
 
         no_boxes_msg = Gtk.Label(label="No Boxes")
         no_boxes_msg_2 = Gtk.Label(
@@ -127,8 +734,7 @@ class MainWindow(Gtk.ApplicationWindow):
         self.main_box.append(no_boxes_msg_2)
 
     def render_not_installed_message(self):
-        while child := self.main_box.get_first_child():
-            self.main_box.remove(child)
+        self.clear_main_box()
 
         not_installed_msg = Gtk.Label(label="Distrobox not found")
         not_installed_msg_2 = Gtk.Label(
@@ -141,9 +747,10 @@ class MainWindow(Gtk.ApplicationWindow):
         self.main_box.append(not_installed_msg)
         self.main_box.append(not_installed_msg_2)
 
-    def make_box_tab(self, box: Distrobox) -> Gtk.Box:
+    def make_box_tab(self, box: Distrobox, stale: bool = False) -> BoxPage:
         """
-        Makes box-specific form for the main content
+        Makes box-specific form for the main content, returning it
+        along with the widgets updated in place
         """
         vbox = Gtk.Box(hexpand=True, orientation=Gtk.Orientation.VERTICAL)
         vbox.set_spacing(15)
@@ -160,6 +767,9 @@ class MainWindow(Gtk.ApplicationWindow):
         page_status = Gtk.Label(label=box.status)
         page_status.set_halign(Gtk.Align.END)
         page_status.set_hexpand(True)
+        if stale:
+            page_status.set_label(f"{box.status} (refreshing...)")
+            page_status.add_css_class("dim-label")
 
         title_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
         title_box.set_spacing(10)
@@ -200,7 +810,8 @@ class MainWindow(Gtk.ApplicationWindow):
         show_box_applications_btn = Gtk.Button()
         show_box_applications_btn.set_icon_name("application-x-executable-symbolic")
         show_box_applications_btn.connect(
-            "clicked", partial(self.show_box_applications, box.name)
+            "clicked",
+            partial(self.show_box_applications, box.name, box.container_id),
         )
         show_box_applications_btn.add_css_class("flat")
 
@@ -209,10 +820,38 @@ class MainWindow(Gtk.ApplicationWindow):
         show_box_applications_row.add_suffix(show_box_applications_btn)
         show_box_applications_row.set_activatable_widget(show_box_applications_btn)
 
+        # Keep Warm
+        keep_warm_switch = Gtk.Switch()
+        keep_warm_switch.set_active(is_warm_box(box.name))
+        keep_warm_switch.set_valign(Gtk.Align.CENTER)
+        keep_warm_switch.connect(
+            "notify::active", partial(self.on_keep_warm_toggled, box.name)
+        )
+
+        keep_warm_row = Adw.ActionRow()
+        keep_warm_row.set_title("Keep Warm")
+        keep_warm_row.set_subtitle("Start this box in the background on launch")
+        keep_warm_row.add_suffix(keep_warm_switch)
+        keep_warm_row.set_activatable_widget(keep_warm_switch)
+
+        # Resources
+        sparkline = Gtk.DrawingArea()
+        sparkline.set_content_width(120)
+        sparkline.set_content_height(32)
+        sparkline.set_valign(Gtk.Align.CENTER)
+        sparkline.set_tooltip_text("CPU usage")
+        sparkline.set_draw_func(partial(self.draw_sparkline, box.container_id))
+
+        stats_row = Adw.ActionRow()
+        stats_row.set_title("Resources")
+        stats_row.add_suffix(sparkline)
+
         # Delete
         delete_box_btn = Gtk.Button()
         delete_box_btn.set_icon_name("user-trash-symbolic")
-        delete_box_btn.connect("clicked", partial(self.delete_box, box.name))
+        delete_box_btn.connect(
+            "clicked", partial(self.delete_box, box.name, box.container_id)
+        )
         delete_box_btn.add_css_class("flat")
 
         delete_box_row = Adw.ActionRow()
@@ -224,6 +863,8 @@ class MainWindow(Gtk.ApplicationWindow):
         boxed_list.append(open_terminal_row)
         boxed_list.append(upgrade_box_row)
         boxed_list.append(show_box_applications_row)
+        boxed_list.append(keep_warm_row)
+        boxed_list.append(stats_row)
         boxed_list.append(delete_box_row)
 
         # put list into page
@@ -231,27 +872,56 @@ class MainWindow(Gtk.ApplicationWindow):
         vbox.append(Gtk.Separator())
         vbox.append(boxed_list)
 
-        return vbox
+        return BoxPage(
+            box=box,
+            page=vbox,
+            page_status=page_status,
+            stats_row=stats_row,
+            sparkline=sparkline,
+        )
+
+    def on_keep_warm_toggled(self, box_name: str, switch, *args):
+        set_warm_box(box_name, switch.get_active())
+
+        if switch.get_active():
+            self.warm_pool.warm_up(
+                [box for box in self.get_boxes() if box.name == box_name]
+            )
 
     def open_terminal(self, box_name: str, *args):
         """
         Runs 'distrobox enter' in either Gnome Terminal, Konsole, or xterm
         """
-        open_terminal_in_box(box_name)
+        self.warm_pool.mark_active(box_name)
+        self.jobs.submit(
+            f"Open terminal in {box_name}",
+            open_terminal_in_box,
+            box_name,
+            box_name=box_name,
+        )
 
-        GLib.timeout_add_seconds(1, self.delayed_rerender)
+        if self.event_watcher is None:
+            GLib.timeout_add_seconds(1, self.delayed_rerender)
 
     def upgrade_box(self, box_name: str, *args):
         """
-        Runs distrobox upgrade
+        Runs distrobox upgrade in a terminal. The job holds the box until
+        the terminal closes, without taking up a worker.
         """
-        upgrade_box(box_name)
+        self.jobs.submit(
+            f"Upgrade {box_name}",
+            upgrade_box,
+            box_name,
+            box_name=box_name,
+            detached=True,
+        )
 
     def create_box(self, *args):
         self.new_box_popup = Gtk.Window()
         self.new_box_popup.set_transient_for(self)
         self.new_box_popup.set_default_size(700, 350)
         self.new_box_popup.set_modal(True)
+        self.new_box_popup.connect("destroy", self.on_new_box_popup_destroyed)
 
         title_lbl = Gtk.Label(label="Create A Distrobox")
         title_lbl.add_css_class("header")
@@ -260,7 +930,8 @@ class MainWindow(Gtk.ApplicationWindow):
         create_btn.add_css_class("suggested-action")
 
         cancel_btn = Gtk.Button(label="Cancel")
-        cancel_btn.connect("clicked", lambda s: self.new_box_popup.destroy())
+        popup = self.new_box_popup
+        cancel_btn.connect("clicked", lambda s: popup.destroy())
 
         new_box_titlebar = Adw.HeaderBar()
         new_box_titlebar.set_title_widget(title_lbl)
@@ -285,66 +956,226 @@ class MainWindow(Gtk.ApplicationWindow):
         name_entry_row.set_hexpand(True)
         name_entry_row.set_title("Name")
 
-        # Image Name
-        images = get_available_images_with_distro_name()
+        # Image Name, from the cache straight away then refreshed
         image_select = Gtk.DropDown()
+        image_select.set_enable_search(True)
+        image_select.set_expression(
+            Gtk.PropertyExpression.new(Gtk.StringObject, None, "string")
+        )
         strlst = Gtk.StringList()
 
-        for img in images:
-            strlst.append(img)
+        cached_images = get_cached_images()
+        if cached_images:
+            for img in cached_images:
+                strlst.append(img)
+        else:
+            strlst.append("Loading Images...")
 
         image_select.set_model(strlst)
 
+        def on_images_loaded(images: list[str]):
+            if not images or images == cached_images:
+                return
+
+            selected = image_select.get_selected_item()
+            selected = selected.get_string() if selected else None
+
+            strlst.splice(0, strlst.get_n_items(), images)
+
+            if selected in images:
+                image_select.set_selected(images.index(selected))
+
+        self.jobs.submit(
+            "Fetch images",
+            get_available_images_with_distro_name,
+            key="images",
+            on_done=on_images_loaded,
+        )
+
         image_select_row = Adw.ActionRow()
         image_select_row.set_title("Image")
         image_select_row.set_activatable_widget(image_select)
         image_select_row.add_suffix(image_select)
 
+        # Initialise
+        init_switch = Gtk.Switch()
+        init_switch.set_active(True)
+        init_switch.set_valign(Gtk.Align.CENTER)
+
+        init_row = Adw.ActionRow()
+        init_row.set_title("Initialise After Creating")
+        init_row.set_subtitle("Run first-time setup now so the box is ready to use")
+        init_row.set_activatable_widget(init_switch)
+        init_row.add_suffix(init_switch)
+
         # do this down here cos the entry row needs to exist
         create_btn.connect(
             "clicked",
             lambda s: self.on_create_box_submit(
                 name_entry_row.get_text(),
                 image_select.get_selected_item(),
+                init_switch.get_active(),
+                create_btn,
             ),
         )
 
         boxed_list.append(name_entry_row)
         boxed_list.append(image_select_row)
+        boxed_list.append(init_row)
 
         new_box_popup_main.append(boxed_list)
 
-        self.create_spinner = Gtk.Spinner()
-        new_box_popup_main.append(self.create_spinner)
+        # Progress, shown once creating starts
+        self.create_status_lbl = Gtk.Label()
+        self.create_status_lbl.set_xalign(0)
+        self.create_status_lbl.set_visible(False)
+
+        self.create_progress = Gtk.ProgressBar()
+        self.create_progress.set_visible(False)
+
+        self.create_log = Gtk.TextView()
+        self.create_log.set_editable(False)
+        self.create_log.set_cursor_visible(False)
+        self.create_log.set_monospace(True)
+
+        self.create_log_scroll = Gtk.ScrolledWindow()
+        self.create_log_scroll.set_vexpand(True)
+        self.create_log_scroll.set_child(self.create_log)
+        self.create_log_scroll.set_visible(False)
+
+        new_box_popup_main.append(self.create_status_lbl)
+        new_box_popup_main.append(self.create_progress)
+        new_box_popup_main.append(self.create_log_scroll)
 
         self.new_box_popup.set_child(new_box_popup_main)
         self.new_box_popup.present()
 
-    def on_create_box_submit(self, box_name: str, selected_image):
+    def on_new_box_popup_destroyed(self, popup: Gtk.Window):
+        # a create still running reports back with a toast instead
+        if popup is self.new_box_popup:
+            self.new_box_popup = None
+
+    def on_create_box_submit(
+        self, box_name: str, selected_image, initialise: bool, create_btn
+    ):
         if not box_name:
             return
 
         box_name = box_name.replace(" ", "-")
 
+        if selected_image is None or " - " not in selected_image.get_string():
+            return
+
         image = selected_image.get_string().split(" ")[-1]
 
-        def bg_func():
-            create_box(box_name, image)
-            GObject.idle_add(self.on_create_box_finish)
+        create_btn.set_sensitive(False)
+        self.create_log.get_buffer().set_text("")
+        self.create_status_lbl.remove_css_class("error")
+
+        # callbacks only touch the dialog which started the create, as it
+        # may have been closed and another opened since
+        popup = self.new_box_popup
+        on_phase = partial(self.on_create_box_phase, popup)
+        on_line = partial(self.on_create_box_line, popup, PullProgress())
+
+        on_phase(f"Creating {box_name}...")
+
+        self.create_status_lbl.set_visible(True)
+        self.create_progress.set_visible(True)
+        self.create_log_scroll.set_visible(True)
 
-        self.create_spinner.start()
-        Thread(target=bg_func).start()
+        def bg_func() -> tuple[Command, Optional[Command]]:
+            command = create_box(box_name, image, on_line)
 
-    def on_create_box_finish(self):
-        self.new_box_popup.destroy()
+            init_command = None
+            if command.succeeded and initialise:
+                dispatch(on_phase, f"Initialising {box_name}...")
+                init_command = init_new_box(box_name, on_line)
+
+            return command, init_command
+
+        self.jobs.submit(
+            f"Create {box_name}",
+            bg_func,
+            box_name=box_name,
+            key=f"create-{box_name}",
+            on_done=partial(self.on_create_box_finish, popup, box_name, create_btn),
+        )
+
+    def on_create_box_phase(self, popup: Gtk.Window, status: str):
+        if popup is not self.new_box_popup:
+            return
+
+        self.create_status_lbl.set_label(status)
+        self.create_progress.set_fraction(0)
+
+    def on_create_box_line(
+        self, popup: Gtk.Window, pull_progress: PullProgress, line: str
+    ):
+        """
+        Appends a line of create output to the log and updates the progress
+        """
+        if popup is not self.new_box_popup:
+            return
+
+        log_buffer = self.create_log.get_buffer()
+        log_buffer.insert(log_buffer.get_end_iter(), f"{line}\n")
+        log_buffer.place_cursor(log_buffer.get_end_iter())
+        self.create_log.scroll_to_mark(log_buffer.get_insert(), 0, False, 0, 0)
+
+        pull_progress.feed(line)
+        fraction = pull_progress.fraction
+        if fraction is None:
+            self.create_progress.pulse()
+        else:
+            self.create_progress.set_fraction(fraction)
+
+    def on_create_box_finish(
+        self,
+        popup: Gtk.Window,
+        box_name: str,
+        create_btn,
+        commands: tuple[Command, Optional[Command]],
+    ):
+        command, init_command = commands
+
+        if self.event_watcher is None and command.succeeded:
+            self.delayed_rerender()
+
+        # the dialog was closed or replaced, so only say how the create went
+        if popup is not self.new_box_popup:
+            if not command.succeeded:
+                toast = Adw.Toast.new(f"Failed to create {box_name}")
+            elif init_command is not None and not init_command.succeeded:
+                toast = Adw.Toast.new(f"Failed to initialise {box_name}")
+            else:
+                toast = Adw.Toast.new("Box Created!")
+
+            self.toast_overlay.add_toast(toast)
+            return
+
+        if not command.succeeded:
+            self.create_status_lbl.set_label("Failed to create box, see below")
+            self.create_status_lbl.add_css_class("error")
+            create_btn.set_sensitive(True)
+
+            return
+
+        # the box exists, so creating it again would fail
+        if init_command is not None and not init_command.succeeded:
+            self.create_status_lbl.set_label(
+                "Box created, but failed to initialise, see below"
+            )
+            self.create_status_lbl.add_css_class("error")
+
+            return
+
+        popup.destroy()
 
         toast = Adw.Toast.new("Box Created!")
         self.toast_overlay.add_toast(toast)
-        self.create_spinner.stop()
-
-        self.delayed_rerender()
 
-    def delete_box(self, box_name: str, *args):
+    def delete_box(self, box_name: str, container_id: str, *args):
         dialogue = Adw.MessageDialog()
         dialogue.set_title("Really Delete?")
         dialogue.set_body(f"Are you sure you want to delete {box_name}?")
@@ -355,27 +1186,38 @@ class MainWindow(Gtk.ApplicationWindow):
         dialogue.set_response_appearance("delete", Adw.ResponseAppearance.DESTRUCTIVE)
         dialogue.set_transient_for(self)
 
-        dialogue.connect("response", partial(self.do_delete_box, box_name))
+        dialogue.connect(
+            "response", partial(self.do_delete_box, box_name, container_id)
+        )
 
         dialogue.present()
 
-    def do_delete_box(self, box_name, dialogue, response_str, *args):
+    def do_delete_box(self, box_name, container_id, dialogue, response_str, *args):
         if response_str and response_str == "delete":
-            delete_box(box_name)
+            self.jobs.submit(
+                f"Delete {box_name}",
+                delete_box,
+                box_name,
+                container_id,
+                box_name=box_name,
+                key=f"delete-{box_name}",
+                on_done=self.on_delete_box_finish,
+            )
 
+    def on_delete_box_finish(self, *args):
+        if self.event_watcher is None:
             self.delayed_rerender()
 
-            toast = Adw.Toast.new("Box Deleted!")
-            self.toast_overlay.add_toast(toast)
+        toast = Adw.Toast.new("Box Deleted!")
+        self.toast_overlay.add_toast(toast)
 
-    def show_box_applications(self, box_name: str, *args):
+    def show_box_applications(self, box_name: str, container_id: str, *args):
         self.show_apps_popup = Gtk.Window()
         self.show_apps_popup.set_transient_for(self)
         self.show_apps_popup.set_default_size(700, 350)
         self.show_apps_popup.set_modal(True)
         self.show_apps_popup.set_title("Installed Applications")
 
-        show_apps_main = Gtk.ScrolledWindow()
         self.show_apps_main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
 
         self.show_apps_main_box.set_spacing(10)
@@ -388,75 +1230,687 @@ class MainWindow(Gtk.ApplicationWindow):
         self.show_apps_success_label = Gtk.Label(label="Loading, Please Wait...")
         self.show_apps_success_label.add_css_class("title-2")
 
+        self.show_apps_search = Gtk.SearchEntry()
+        self.show_apps_search.set_placeholder_text("Filter by name or command")
+        self.show_apps_search.set_visible(False)
+
+        self.show_apps_empty_label = Gtk.Label(label="No Apps Installed")
+        self.show_apps_empty_label.add_css_class("title-2")
+        self.show_apps_empty_label.set_visible(False)
+
+        # apps ticked for adding to the menu, and apps already in it
+        self.show_apps_selected: set[str] = set()
+        self.show_apps_exported: set[str] = set()
+
+        # icons copied out of the box, by the name apps use for them
+        self.show_apps_container_id = container_id
+        self.show_apps_icons = get_cached_icons(container_id)
+
+        self.export_selected_btn = Gtk.Button(label="Add Selected To Menu")
+        self.export_selected_btn.add_css_class("pill")
+        self.export_selected_btn.add_css_class("suggested-action")
+        self.export_selected_btn.set_sensitive(False)
+        self.export_selected_btn.connect(
+            "clicked",
+            lambda b: self.export_apps_to_menu(
+                box_name, sorted(self.show_apps_selected)
+            ),
+        )
+
+        export_all_btn = Gtk.Button(label="Add All To Menu")
+        export_all_btn.add_css_class("pill")
+        export_all_btn.connect(
+            "clicked", lambda b: self.export_all_apps_to_menu(box_name)
+        )
+
+        self.show_apps_export_bar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self.show_apps_export_bar.set_spacing(10)
+        self.show_apps_export_bar.set_halign(Gtk.Align.END)
+        self.show_apps_export_bar.set_visible(False)
+        self.show_apps_export_bar.append(export_all_btn)
+        self.show_apps_export_bar.append(self.export_selected_btn)
+
         self.show_apps_main_box.append(self.show_apps_success_label)
         self.show_apps_main_box.append(self.show_apps_spinner)
+        self.show_apps_main_box.append(self.show_apps_search)
+        self.show_apps_main_box.append(self.show_apps_empty_label)
+        self.show_apps_main_box.append(self.make_apps_list(box_name))
+        self.show_apps_main_box.append(self.show_apps_export_bar)
 
-        show_apps_main.set_child(self.show_apps_main_box)
-        self.show_apps_popup.set_child(show_apps_main)
+        self.show_apps_popup.set_child(self.show_apps_main_box)
 
         self.show_apps_popup.present()
         self.show_apps_spinner.start()
 
-        def bg_func():
-            local_apps = get_apps_in_box(box_name)
-            GObject.idle_add(self.on_list_local_apps_called, local_apps, box_name)
+        run_in_background(
+            get_exported_apps,
+            box_name,
+            on_done=partial(self.on_exported_apps_found, self.show_apps_popup),
+        )
+
+        # show the last scan straight away, the box is rescanned if it changed
+        cached_apps = get_cached_apps_in_box(container_id)
+        if cached_apps is not None:
+            self.on_list_local_apps_called(cached_apps, box_name, refreshing=True)
+
+        popup = self.show_apps_popup
+
+        def on_apps_revalidated(local_apps):
+            # the dialog may have been closed and opened for another box since
+            if popup is not self.show_apps_popup:
+                return
+
+            if cached_apps is not None and local_apps == cached_apps:
+                self.show_apps_spinner.stop()
+            else:
+                self.on_list_local_apps_called(local_apps, box_name)
+
+            self.extract_app_icons(box_name, container_id, local_apps)
+
+        self.jobs.submit(
+            f"List applications in {box_name}",
+            get_apps_in_box,
+            box_name,
+            container_id,
+            box_name=box_name,
+            key=f"apps-{box_name}",
+            on_done=on_apps_revalidated,
+        )
+
+    def make_apps_list(self, box_name: str) -> Gtk.ScrolledWindow:
+        """
+        Makes a ListView over the box's apps. Only rows on screen have
+        widgets, which are recycled as the list scrolls, and icons are
+        only looked up when a row is bound to an app.
+        """
+        self.show_apps_store = Gio.ListStore(item_type=AppItem)
+
+        self.show_apps_filter = Gtk.CustomFilter.new(self.filter_app_item)
+        self.show_apps_search.connect(
+            "search-changed",
+            lambda s: self.show_apps_filter.changed(Gtk.FilterChange.DIFFERENT),
+        )
+
+        apps_filter_model = Gtk.FilterListModel(
+            model=self.show_apps_store, filter=self.show_apps_filter
+        )
 
-        Thread(target=bg_func).start()
+        apps_factory = Gtk.SignalListItemFactory()
+        apps_factory.connect("setup", self.on_app_row_setup, box_name)
+        apps_factory.connect("bind", self.on_app_row_bind)
+        apps_factory.connect("unbind", self.on_app_row_unbind)
 
-    def on_list_local_apps_called(self, local_apps, box_name):
+        apps_list = Gtk.ListView(
+            model=Gtk.NoSelection(model=apps_filter_model), factory=apps_factory
+        )
+        apps_list.add_css_class("rich-list")
+
+        apps_scroll = Gtk.ScrolledWindow()
+        apps_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        apps_scroll.set_vexpand(True)
+        apps_scroll.set_child(apps_list)
+
+        return apps_scroll
+
+    def filter_app_item(self, item: AppItem) -> bool:
+        query = self.show_apps_search.get_text().strip().lower()
+        if not query:
+            return True
+
+        return query in item.app.name.lower() or query in item.app.exec_name.lower()
+
+    def on_app_row_setup(self, factory, list_item, box_name: str):
+        # buttons look up the row's current app, as rows are recycled
+        def on_check_toggled(check):
+            item = list_item.get_item()
+            if item is None:
+                return
+
+            if check.get_active():
+                self.show_apps_selected.add(item.app.desktop_file)
+            else:
+                self.show_apps_selected.discard(item.app.desktop_file)
+
+            self.update_export_selected_btn()
+
+        select_check = Gtk.CheckButton()
+        select_check.set_valign(Gtk.Align.CENTER)
+        select_check.connect("toggled", on_check_toggled)
+
+        img = Gtk.Image()
+        img.set_icon_size(Gtk.IconSize.LARGE)
+
+        name_lbl = Gtk.Label()
+        name_lbl.set_xalign(0)
+        name_lbl.set_ellipsize(Pango.EllipsizeMode.END)
+
+        exec_lbl = Gtk.Label()
+        exec_lbl.set_xalign(0)
+        exec_lbl.set_ellipsize(Pango.EllipsizeMode.END)
+        exec_lbl.add_css_class("dim-label")
+        exec_lbl.add_css_class("caption")
+
+        labels = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        labels.set_hexpand(True)
+        labels.set_valign(Gtk.Align.CENTER)
+        labels.append(name_lbl)
+        labels.append(exec_lbl)
+
+        exported_img = Gtk.Image.new_from_icon_name("emblem-ok-symbolic")
+        exported_img.set_tooltip_text("Already in the menu")
+
+        run_btn = Gtk.Button(label="Run")
+        run_btn.add_css_class("pill")
+        run_btn.set_valign(Gtk.Align.CENTER)
+        run_btn.connect(
+            "clicked",
+            lambda b: self.launch_app(list_item.get_item().app.exec_name, box_name),
+        )
+
+        add_menu_btn = Gtk.Button(label="Add To Menu")
+        add_menu_btn.add_css_class("pill")
+        add_menu_btn.set_valign(Gtk.Align.CENTER)
+        add_menu_btn.connect(
+            "clicked",
+            lambda b: self.add_app_to_menu(
+                box_name, list_item.get_item().app.desktop_file
+            ),
+        )
+
+        row = Gtk.Box()
+        row.set_spacing(10)
+        row.append(select_check)
+        row.append(img)
+        row.append(labels)
+        row.append(exported_img)
+        row.append(run_btn)
+        row.append(Gtk.Separator())
+        row.append(add_menu_btn)
+
+        list_item.set_child(row)
+
+    def on_app_row_bind(self, factory, list_item):
+        app = list_item.get_item().app
+        select_check = list_item.get_child().get_first_child()
+        img = select_check.get_next_sibling()
+        labels = img.get_next_sibling()
+        exported_img = labels.get_next_sibling()
+
+        select_check.set_active(app.desktop_file in self.show_apps_selected)
+
+        icon_path = self.show_apps_icons.get(app.icon)
+        if icon_path:
+            img.set_from_file(icon_path)
+        else:
+            img.set_from_icon_name(app.icon)
+
+        labels.get_first_child().set_label(app.name)
+        labels.get_last_child().set_label(app.exec_name)
+        exported_img.set_visible(app.desktop_file in self.show_apps_exported)
+
+    def on_app_row_unbind(self, factory, list_item):
+        list_item.get_child().get_first_child().get_next_sibling().clear()
+
+    def on_list_local_apps_called(self, local_apps, box_name, refreshing=False):
         self.show_apps_success_label.hide()
 
-        if not len(local_apps):
-            no_apps_lbl = Gtk.Label(label="No Apps Installed")
-            no_apps_lbl.add_css_class("title-2")
+        if not refreshing:
             self.show_apps_spinner.stop()
-            self.show_apps_main_box.append(no_apps_lbl)
 
+        self.show_apps_empty_label.set_visible(not len(local_apps))
+        self.show_apps_search.set_visible(bool(len(local_apps)))
+        self.show_apps_export_bar.set_visible(bool(len(local_apps)))
+
+        self.show_apps_selected &= {app.desktop_file for app in local_apps}
+        self.update_export_selected_btn()
+
+        self.show_apps_store.splice(
+            0,
+            self.show_apps_store.get_n_items(),
+            [AppItem(app) for app in local_apps],
+        )
+
+    def extract_app_icons(
+        self, box_name: str, container_id: str, local_apps: list[LocalApp]
+    ):
+        """
+        Copies the icons the host's theme doesn't have out of the box, in
+        the background. Rows show the theme's icon until then.
+        """
+        icon_theme = Gtk.IconTheme.get_for_display(self.get_display())
+        icons = [
+            app.icon
+            for app in local_apps
+            if app.icon
+            and app.icon not in self.show_apps_icons
+            and (app.icon.startswith("/") or not icon_theme.has_icon(app.icon))
+        ]
+
+        if not icons:
             return
 
-        boxed_list = Gtk.ListBox()
-        boxed_list.add_css_class("boxed-list")
+        self.jobs.submit(
+            f"Copy application icons from {box_name}",
+            extract_icons_from_box,
+            container_id,
+            icons,
+            key=f"icons-{box_name}",
+            on_done=partial(self.on_app_icons_extracted, container_id),
+        )
+
+    def on_app_icons_extracted(self, container_id: str, icons: dict[str, str]):
+        # the dialog may have been reopened for another box since
+        if container_id != self.show_apps_container_id:
+            return
+
+        self.show_apps_icons = icons
+        self.refresh_app_rows()
+
+    def on_exported_apps_found(self, popup: Gtk.Window, exported_apps: set[str]):
+        if popup is not self.show_apps_popup:
+            return
+
+        self.show_apps_exported = exported_apps
+        self.refresh_app_rows()
+
+    def refresh_app_rows(self):
+        """
+        Rebinds every row, to show changed selected and exported states
+        """
+        n_items = self.show_apps_store.get_n_items()
+        self.show_apps_store.items_changed(0, n_items, n_items)
+
+    def update_export_selected_btn(self):
+        selected = len(self.show_apps_selected)
+
+        self.export_selected_btn.set_sensitive(selected > 0)
+        if selected:
+            self.export_selected_btn.set_label(f"Add {selected} To Menu")
+        else:
+            self.export_selected_btn.set_label("Add Selected To Menu")
+
+    def launch_app(self, exec_name: str, box_name: str, *args):
+        self.warm_pool.mark_active(box_name)
+
+        with tracing.traced_action(f"Run {exec_name} in {box_name}"):
+            launch_app_in_box(exec_name, box_name)
+
+    def add_app_to_menu(self, box_name: str, app_name: str, *args):
+        self.export_apps_to_menu(box_name, [app_name])
 
-        for app in local_apps:
-            app_row = Adw.ActionRow()
-            app_row.set_title(app.name)
+    def export_all_apps_to_menu(self, box_name: str):
+        apps = [
+            item.app.desktop_file
+            for item in self.show_apps_store
+            if item.app.desktop_file not in self.show_apps_exported
+        ]
 
-            img = Gtk.Image.new_from_icon_name(app.icon)
+        self.export_apps_to_menu(box_name, apps)
+
+    def export_apps_to_menu(self, box_name: str, apps: list[str]):
+        """
+        Exports the apps in a single pass through the box
+        """
+        if not apps:
+            return
+
+        title = f"Add {apps[0]} to menu"
+        if len(apps) > 1:
+            title = f"Add {len(apps)} apps from {box_name} to menu"
+
+        self.jobs.submit(
+            title,
+            export_apps_from_box,
+            box_name,
+            apps,
+            box_name=box_name,
+            key=f"export-{box_name}-{','.join(apps)}",
+            on_done=partial(self.on_apps_added_to_menu, self.show_apps_popup),
+        )
 
-            add_menu_btn = Gtk.Button(label="Add To Menu")
-            add_menu_btn.add_css_class("pill")
-            add_menu_btn.connect(
-                "clicked", partial(self.add_app_to_menu, box_name, app.desktop_file)
+    def on_apps_added_to_menu(self, popup: Gtk.Window, results: list[AppExportResult]):
+        exported = {result.app for result in results if result.succeeded}
+
+        # the dialog may have been closed and opened for another box since
+        popup_is_current = popup is self.show_apps_popup
+        if popup_is_current:
+            self.show_apps_exported |= exported
+            self.show_apps_selected -= exported
+            self.update_export_selected_btn()
+            self.refresh_app_rows()
+
+        if len(exported) < len(results):
+            self.show_results_dialog(
+                "Add To Menu",
+                [(result.app, result.succeeded, result.log) for result in results],
+                popup if popup_is_current else self,
             )
+            return
+
+        if not popup_is_current:
+            return
+
+        if len(results) == 1:
+            self.show_apps_success_label.set_label(f"{results[0].app} added to menu!")
+        else:
+            self.show_apps_success_label.set_label(
+                f"{len(results)} apps added to menu!"
+            )
+
+        self.show_apps_success_label.show()
+
+        GLib.timeout_add_seconds(2, self.show_apps_success_label.hide)
+
+    def show_batch_popup(self, *args):
+        """
+        Lets the user pick several boxes and run one action over all of them
+        """
+        boxes = sorted(self.get_boxes(), key=lambda box: box.name)
+        if not boxes:
+            return
+
+        self.batch_popup = Gtk.Window()
+        self.batch_popup.set_transient_for(self)
+        self.batch_popup.set_default_size(600, 450)
+        self.batch_popup.set_modal(True)
+
+        title_lbl = Gtk.Label(label="Batch Actions")
+        title_lbl.add_css_class("header")
+
+        batch_titlebar = Adw.HeaderBar()
+        batch_titlebar.set_title_widget(title_lbl)
+        self.batch_popup.set_titlebar(batch_titlebar)
+
+        batch_main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        batch_main.set_spacing(10)
+        batch_main.set_margin_top(10)
+        batch_main.set_margin_bottom(10)
+        batch_main.set_margin_start(10)
+        batch_main.set_margin_end(10)
+
+        # Box selection
+        boxes_list = Gtk.ListBox()
+        boxes_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        boxes_list.add_css_class("boxed-list")
+
+        box_checks = {}
+
+        select_all_check = Gtk.CheckButton()
+        select_all_row = Adw.ActionRow()
+        select_all_row.set_title("Select All")
+        select_all_row.add_prefix(select_all_check)
+        select_all_row.set_activatable_widget(select_all_check)
+
+        def on_select_all(check_btn):
+            for box_check in box_checks.values():
+                box_check.set_active(check_btn.get_active())
+
+        select_all_check.connect("toggled", on_select_all)
+        boxes_list.append(select_all_row)
+
+        for box in boxes:
+            box_check = Gtk.CheckButton()
+            box_checks[box.name] = box_check
+
+            box_row = Adw.ActionRow()
+            box_row.set_title(box.name)
+            box_row.set_subtitle(box.status)
+            box_row.add_prefix(box_check)
+            box_row.set_activatable_widget(box_check)
+
+            boxes_list.append(box_row)
+
+        boxes_scroll = Gtk.ScrolledWindow()
+        boxes_scroll.set_vexpand(True)
+        boxes_scroll.set_child(boxes_list)
+
+        # Concurrency
+        concurrency_spin = Gtk.SpinButton.new_with_range(1, 16, 1)
+        concurrency_spin.set_value(get_setting("batch_concurrency"))
+        concurrency_spin.set_valign(Gtk.Align.CENTER)
+
+        concurrency_list = Gtk.ListBox()
+        concurrency_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        concurrency_list.add_css_class("boxed-list")
+
+        concurrency_row = Adw.ActionRow()
+        concurrency_row.set_title("Boxes At Once")
+        concurrency_row.add_suffix(concurrency_spin)
+        concurrency_list.append(concurrency_row)
+
+        # Actions
+        container_ids = {box.name: box.container_id for box in boxes}
+        actions = (
+            ("Upgrade", upgrade_box_headless, False),
+            ("Stop", stop_box, False),
+            ("Export", export_box_image, False),
+            ("Delete", lambda name: remove_box(name, container_ids[name]), True),
+        )
+
+        actions_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        actions_box.set_spacing(10)
+        actions_box.set_halign(Gtk.Align.CENTER)
 
-            run_btn = Gtk.Button(label="Run")
-            run_btn.add_css_class("pill")
-            run_btn.connect(
+        for title, func, destructive in actions:
+            action_btn = Gtk.Button(label=title)
+            action_btn.add_css_class("pill")
+            if destructive:
+                action_btn.add_css_class("destructive-action")
+
+            action_btn.connect(
                 "clicked",
                 partial(
-                    run_command_in_box,
-                    app.exec_name,
-                    box_name,
+                    self.on_batch_action,
+                    title,
+                    func,
+                    destructive,
+                    box_checks,
+                    concurrency_spin,
                 ),
             )
+            actions_box.append(action_btn)
 
-            app_row.add_prefix(img)
-            app_row.add_suffix(run_btn)
-            app_row.add_suffix(Gtk.Separator())
-            app_row.add_suffix(add_menu_btn)
+        self.batch_progress = Gtk.ProgressBar()
+        self.batch_progress.set_show_text(True)
+        self.batch_progress.set_visible(False)
 
-            boxed_list.append(app_row)
+        batch_main.append(boxes_scroll)
+        batch_main.append(concurrency_list)
+        batch_main.append(actions_box)
+        batch_main.append(self.batch_progress)
 
-        self.show_apps_spinner.stop()
-        self.show_apps_main_box.append(boxed_list)
+        self.batch_popup.set_child(batch_main)
+        self.batch_popup.present()
 
-    def add_app_to_menu(self, box_name: str, app_name: str, *args):
-        export_app_from_box(box_name, app_name)
+    def on_batch_action(
+        self, title: str, func, destructive: bool, box_checks, concurrency_spin, *args
+    ):
+        box_names = [name for name, check in box_checks.items() if check.get_active()]
+        if not box_names:
+            return
 
-        self.show_apps_success_label.set_label(f"{app_name} added to menu!")
-        self.show_apps_success_label.show()
+        limit = concurrency_spin.get_value_as_int()
+        set_setting("batch_concurrency", limit)
 
-        GLib.timeout_add_seconds(2, self.show_apps_success_label.hide)
+        if not destructive:
+            return self.run_batch(title, func, box_names, limit)
+
+        dialogue = Adw.MessageDialog()
+        dialogue.set_title(f"Really {title}?")
+        dialogue.set_body(
+            f"Are you sure you want to {title.lower()} {', '.join(box_names)}?"
+        )
+        dialogue.add_response("cancel", "Cancel")
+        dialogue.add_response("confirm", title)
+        dialogue.set_default_response("cancel")
+        dialogue.set_close_response("cancel")
+        dialogue.set_response_appearance("confirm", Adw.ResponseAppearance.DESTRUCTIVE)
+        dialogue.set_transient_for(self.batch_popup)
+
+        def on_response(dialogue, response_str):
+            if response_str == "confirm":
+                self.run_batch(title, func, box_names, limit)
+
+        dialogue.connect("response", on_response)
+        dialogue.present()
+
+    def run_batch(self, title: str, func, box_names: list[str], limit: int):
+        self.batch_progress.set_visible(True)
+        self.batch_progress.set_fraction(0)
+        self.batch_progress.set_text(f"{title}: 0 / {len(box_names)}")
+
+        def on_result(result: BatchResult):
+            done = len(batch.results)
+            self.batch_progress.set_fraction(done / batch.total)
+            self.batch_progress.set_text(f"{title}: {done} / {batch.total}")
+
+        batch = self.jobs.submit_batch(
+            title,
+            func,
+            box_names,
+            limit,
+            on_result=on_result,
+            on_finished=self.on_batch_finished,
+        )
+
+    def on_batch_finished(self, batch: Batch):
+        """
+        Shows which boxes succeeded and failed, with each box's log
+        """
+        if self.event_watcher is None:
+            self.delayed_rerender()
+
+        self.show_results_dialog(
+            batch.title,
+            [
+                (result.box_name, result.succeeded, result.log)
+                for result in sorted(batch.results, key=lambda r: r.box_name)
+            ],
+            self.batch_popup,
+        )
+
+    def show_results_dialog(
+        self, title: str, results: list[tuple[str, bool, str]], transient_for
+    ):
+        """
+        Shows which of several things succeeded and failed, each with its log
+        """
+        failures = len([result for result in results if not result[1]])
+        successes = len(results) - failures
+
+        results_list = Gtk.ListBox()
+        results_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        results_list.add_css_class("boxed-list")
+
+        for name, succeeded, log in results:
+            result_row = Adw.ExpanderRow()
+            result_row.set_title(name)
+            result_row.set_subtitle("Succeeded" if succeeded else "Failed")
+
+            # the end of the log is where any error will be
+            log_lbl = Gtk.Label(label=log[-4000:] or "No Output")
+            log_lbl.set_selectable(True)
+            log_lbl.set_wrap(True)
+            log_lbl.set_xalign(0)
+            log_lbl.add_css_class("monospace")
+            result_row.add_row(log_lbl)
+
+            results_list.append(result_row)
+
+        results_scroll = Gtk.ScrolledWindow()
+        results_scroll.set_propagate_natural_height(True)
+        results_scroll.set_max_content_height(300)
+        results_scroll.set_child(results_list)
+
+        dialogue = Adw.MessageDialog()
+        dialogue.set_title(f"{title} Finished")
+        dialogue.set_body(f"{successes} succeeded, {failures} failed")
+        dialogue.set_extra_child(results_scroll)
+        dialogue.add_response("close", "Close")
+        dialogue.set_transient_for(transient_for)
+        dialogue.present()
+
+    def show_preferences_popup(self, *args):
+        prefs_window = Adw.PreferencesWindow()
+        prefs_window.set_transient_for(self)
+        prefs_window.set_modal(True)
+
+        prefs_page = Adw.PreferencesPage()
+
+        warm_group = Adw.PreferencesGroup()
+        warm_group.set_title("Warm Boxes")
+        warm_group.set_description(
+            "Boxes set to Keep Warm are started when BoxBuddy opens"
+        )
+
+        idle_spin = Gtk.SpinButton.new_with_range(0, 24 * 60, 5)
+        idle_spin.set_value(get_setting("idle_stop_minutes"))
+        idle_spin.set_valign(Gtk.Align.CENTER)
+        idle_spin.connect(
+            "value-changed",
+            lambda s: set_setting("idle_stop_minutes", s.get_value_as_int()),
+        )
+
+        idle_row = Adw.ActionRow()
+        idle_row.set_title("Stop Idle Boxes After (Minutes)")
+        idle_row.set_subtitle("Boxes which aren't kept warm, 0 to never stop them")
+        idle_row.add_suffix(idle_spin)
+
+        warm_group.add(idle_row)
+        prefs_page.add(warm_group)
+
+        sessions_group = Adw.PreferencesGroup()
+        sessions_group.set_title("Performance")
+
+        sessions_switch = Gtk.Switch()
+        sessions_switch.set_active(get_setting("exec_sessions"))
+        sessions_switch.set_valign(Gtk.Align.CENTER)
+
+        def on_sessions_toggled(switch, *args):
+            set_setting("exec_sessions", switch.get_active())
+            if not switch.get_active():
+                run_in_background(close_box_sessions)
+
+        sessions_switch.connect("notify::active", on_sessions_toggled)
+
+        sessions_row = Adw.ActionRow()
+        sessions_row.set_title("Reuse Box Sessions")
+        sessions_row.set_subtitle(
+            "Run app listing, exports and launches through one shell per box, "
+            "kept open until idle"
+        )
+        sessions_row.add_suffix(sessions_switch)
+        sessions_row.set_activatable_widget(sessions_switch)
+
+        sessions_group.add(sessions_row)
+
+        if is_flatpak():
+            bridge_switch = Gtk.Switch()
+            bridge_switch.set_active(get_setting("host_bridge"))
+            bridge_switch.set_valign(Gtk.Align.CENTER)
+
+            def on_bridge_toggled(switch, *args):
+                set_setting("host_bridge", switch.get_active())
+                if not switch.get_active():
+                    run_in_background(close_host_bridge)
+
+            bridge_switch.connect("notify::active", on_bridge_toggled)
+
+            bridge_row = Adw.ActionRow()
+            bridge_row.set_title("Reuse Host Shells")
+            bridge_row.set_subtitle(
+                "Run quick commands on the host through a few long-lived shells "
+                "instead of a new flatpak-spawn each"
+            )
+            bridge_row.add_suffix(bridge_switch)
+            bridge_row.set_activatable_widget(bridge_switch)
+
+            sessions_group.add(bridge_row)
+
+        prefs_page.add(sessions_group)
+        prefs_window.add(prefs_page)
+
+        prefs_window.present()
 
     def show_about_popup(self, *args):
         dialogue = Adw.AboutWindow(transient_for=self)
@@ -475,5 +1929,157 @@ class MainWindow(Gtk.ApplicationWindow):
         dialogue.set_application_icon("co.uk.dvlv.boxbuddy")
         dialogue.show()
 
+    def show_debug_panel(self, *args):
+        """
+        Shows the commands BoxBuddy has run, with timings, for finding
+        what makes it slow
+        """
+        if self.debug_popup is not None:
+            self.debug_popup.present()
+            return True
+
+        self.debug_popup = Gtk.Window()
+        self.debug_popup.set_transient_for(self)
+        self.debug_popup.set_default_size(900, 500)
+
+        title_lbl = Gtk.Label(label="Command Trace")
+        title_lbl.add_css_class("header")
+
+        export_json_btn = Gtk.Button(label="Export JSON")
+        export_json_btn.connect("clicked", partial(self.on_export_traces, False))
+
+        export_chrome_btn = Gtk.Button(label="Export Chrome Trace")
+        export_chrome_btn.connect("clicked", partial(self.on_export_traces, True))
+
+        clear_btn = Gtk.Button()
+        clear_btn.set_icon_name("edit-clear-all-symbolic")
+        clear_btn.set_tooltip_text("Clear")
+        clear_btn.connect("clicked", self.on_clear_traces)
+
+        debug_titlebar = Adw.HeaderBar()
+        debug_titlebar.set_title_widget(title_lbl)
+        debug_titlebar.pack_start(export_json_btn)
+        debug_titlebar.pack_start(export_chrome_btn)
+        debug_titlebar.pack_end(clear_btn)
+        self.debug_popup.set_titlebar(debug_titlebar)
+
+        self.trace_store = Gio.ListStore(item_type=TraceItem)
+        self.trace_store.splice(
+            0, 0, [TraceItem(trace) for trace in tracing.get_traces()]
+        )
+
+        trace_factory = Gtk.SignalListItemFactory()
+        trace_factory.connect("setup", self.on_trace_row_setup)
+        trace_factory.connect("bind", self.on_trace_row_bind)
+
+        trace_list = Gtk.ListView(
+            model=Gtk.NoSelection(model=self.trace_store), factory=trace_factory
+        )
+
+        trace_scroll = Gtk.ScrolledWindow()
+        trace_scroll.set_vexpand(True)
+        trace_scroll.set_child(trace_list)
+
+        self.debug_toast_overlay = Adw.ToastOverlay()
+        self.debug_toast_overlay.set_child(trace_scroll)
+        self.debug_popup.set_child(self.debug_toast_overlay)
+
+        def on_close(*args):
+            self.debug_popup = None
+            self.trace_store = None
+
+        self.debug_popup.connect("close-request", on_close)
+        self.debug_popup.present()
+
+        return True
+
+    def on_trace_row_setup(self, factory, list_item):
+        row = Gtk.Box()
+        row.set_spacing(15)
+        row.set_margin_start(10)
+        row.set_margin_end(10)
+
+        for width_chars in (9, 10, 10, 24):
+            column_lbl = Gtk.Label()
+            column_lbl.set_xalign(0)
+            column_lbl.set_width_chars(width_chars)
+            column_lbl.set_max_width_chars(width_chars)
+            column_lbl.set_ellipsize(Pango.EllipsizeMode.END)
+            row.append(column_lbl)
+
+        command_lbl = Gtk.Label()
+        command_lbl.set_xalign(0)
+        command_lbl.set_hexpand(True)
+        command_lbl.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+        command_lbl.add_css_class("monospace")
+        row.append(command_lbl)
+
+        list_item.set_child(row)
+
+    def on_trace_row_bind(self, factory, list_item):
+        trace = list_item.get_item().trace
+
+        if trace.cancelled:
+            outcome = "cancelled"
+        elif trace.timed_out:
+            outcome = "timed out"
+        else:
+            outcome = f"exit {trace.returncode}"
+
+        columns = (
+            f"{trace.duration * 1000:.0f} ms",
+            outcome,
+            format_size(trace.stdout_bytes + trace.stderr_bytes),
+            trace.action,
+            " ".join(trace.command),
+        )
+
+        column_lbl = list_item.get_child().get_first_child()
+        for column in columns:
+            column_lbl.set_label(column)
+            column_lbl.set_tooltip_text(column)
+            column_lbl = column_lbl.get_next_sibling()
+
+    def on_command_traced(self, trace: tracing.CommandTrace):
+        if self.trace_store is None:
+            return
+
+        self.trace_store.append(TraceItem(trace))
+        if self.trace_store.get_n_items() > tracing.TRACE_LIMIT:
+            self.trace_store.remove(0)
+
+    def on_clear_traces(self, *args):
+        tracing.clear_traces()
+        self.trace_store.remove_all()
+
+    def on_export_traces(self, chrome: bool, *args):
+        """
+        Asks where to save the log. Under flatpak the file chooser portal
+        gives a path on the host, which the sandbox can't otherwise write.
+        """
+        file_dialog = Gtk.FileDialog()
+        file_dialog.set_title("Export Trace")
+        file_dialog.set_initial_name(tracing.get_export_name(chrome))
+        file_dialog.save(
+            self.debug_popup, None, partial(self.on_export_file_chosen, chrome)
+        )
+
+    def on_export_file_chosen(self, chrome: bool, file_dialog, result):
+        try:
+            export_file = file_dialog.save_finish(result)
+        except GLib.Error:
+            # cancelled
+            return
+
+        path = export_file.get_path()
+        try:
+            tracing.export_traces(path, chrome=chrome)
+        except (OSError, TypeError) as e:
+            toast = Adw.Toast.new(f"Could not export trace: {e}")
+        else:
+            toast = Adw.Toast.new(f"Saved to {export_file.get_basename()}")
+
+        self.debug_toast_overlay.add_toast(toast)
+
     def delayed_rerender(self):
         self.load_boxes()
@@ -0,0 +1,57 @@
+import threading
+from collections import deque
+from typing import Optional
+
+from distrobox_handler import BoxStats, Distrobox, get_box_stats
+from warm_pool import is_running
+
+# how often running boxes are sampled, and how many samples each box keeps
+SAMPLE_INTERVAL_SECONDS = 3
+HISTORY_LENGTH = 60
+
+
+class ResourceMonitor:
+    """
+    Samples the resource usage of every running box with one engine call,
+    keeping a fixed-size history per box
+    """
+
+    def __init__(self, history_length: int = HISTORY_LENGTH):
+        self.history_length = history_length
+        self.history: dict[str, deque[BoxStats]] = {}
+        self.latest: dict[str, BoxStats] = {}
+
+        self._lock = threading.Lock()
+
+    def sample(self, boxes: list[Distrobox]) -> dict[str, BoxStats]:
+        """
+        Takes one sample of all running boxes. Safe to call from a worker thread.
+        """
+        running_ids = [box.container_id for box in boxes if is_running(box)]
+        stats = get_box_stats(running_ids)
+
+        box_ids = {box.container_id for box in boxes}
+        with self._lock:
+            for container_id in list(self.history):
+                if container_id not in box_ids:
+                    del self.history[container_id]
+
+            for container_id, box_stats in stats.items():
+                self.history.setdefault(
+                    container_id, deque(maxlen=self.history_length)
+                ).append(box_stats)
+
+            self.latest = stats
+
+        return stats
+
+    def get_latest(self, container_id: str) -> Optional[BoxStats]:
+        """
+        The box's stats from the last sample, or None if it wasn't running
+        """
+        with self._lock:
+            return self.latest.get(container_id)
+
+    def get_history(self, container_id: str) -> list[BoxStats]:
+        with self._lock:
+            return list(self.history.get(container_id, ()))
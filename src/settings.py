@@ -0,0 +1,63 @@
+import json
+import os
+from typing import Any
+
+DEFAULT_SETTINGS = {
+    # how many boxes a batch action works on at once
+    "batch_concurrency": 4,
+    # boxes to start in the background when BoxBuddy opens
+    "warm_boxes": [],
+    # stop other boxes after this many idle minutes, 0 to never stop them
+    "idle_stop_minutes": 0,
+    # run commands in boxes through one long-lived shell per box
+    "exec_sessions": False,
+    # under flatpak, run quick host commands through a few reused host shells
+    "host_bridge": True,
+}
+
+
+def get_settings_path() -> str:
+    base = os.getenv("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+
+    return os.path.join(base, "boxbuddy", "settings.json")
+
+
+def load_settings() -> dict[str, Any]:
+    """
+    Loads user settings on top of the defaults
+    """
+    settings = dict(DEFAULT_SETTINGS)
+
+    try:
+        with open(get_settings_path(), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return settings
+
+    if isinstance(saved, dict):
+        settings.update(saved)
+
+    return settings
+
+
+def get_setting(key: str) -> Any:
+    return load_settings().get(key, DEFAULT_SETTINGS.get(key))
+
+
+def set_setting(key: str, value: Any):
+    settings = load_settings()
+    settings[key] = value
+    save_settings(settings)
+
+
+def save_settings(settings: dict[str, Any]):
+    path = get_settings_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=4)
+    except OSError:
+        pass
@@ -0,0 +1,240 @@
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from typing import Optional
+
+import tracing
+from command_runner import get_host_command
+
+# close a session after this long without a command
+IDLE_TIMEOUT_SECONDS = 120
+
+# Defined in the session's shell. Runs one command with stdin from /dev/null,
+# then replies with a header line of marker, exit code and the byte lengths
+# of stdout and stderr, followed by exactly that many bytes of each.
+SESSION_PRELUDE = r"""
+__boxbuddy_run() {
+    __bb_marker=$1
+    shift
+    __bb_out=$(mktemp) || return
+    __bb_err=$(mktemp) || return
+    "$@" </dev/null >"$__bb_out" 2>"$__bb_err"
+    __bb_rc=$?
+    printf '\n%s %s %s %s\n' "$__bb_marker" "$__bb_rc" \
+        "$(wc -c <"$__bb_out")" "$(wc -c <"$__bb_err")"
+    cat "$__bb_out" "$__bb_err"
+    rm -f "$__bb_out" "$__bb_err"
+}
+"""
+
+
+class SessionError(Exception):
+    pass
+
+
+class ShellSession:
+    """
+    A long-lived shell, e.g. one inside a box, which runs commands one at
+    a time so their setup cost is only paid once. The shell is started on
+    first use, restarted if it dies, and closed after being idle.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+        trace: bool = True,
+    ):
+        self.command = get_host_command(command)
+        self.idle_timeout = idle_timeout
+        self.trace = trace
+
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._idle_timer: Optional[threading.Timer] = None
+        # counts closes, so a command cut short by one isn't retried
+        self._closes = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def run(self, argv: list[str]) -> tuple[int, str, str]:
+        """
+        Runs argv in the session, returning its exit code, stdout and stderr.
+        If the session has died it is restarted and the command tried once more.
+        """
+        result = self.try_run(argv)
+        if result is None:
+            return 127, "", "session could not be started"
+
+        return result
+
+    def try_run(self, argv: list[str]) -> Optional[tuple[int, str, str]]:
+        """
+        Like run, but returns None if the session can't run commands at all
+        """
+        with self._lock:
+            self._cancel_idle_timer()
+
+            started_at = time.time()
+            start_time = time.perf_counter()
+            closes = self._closes
+
+            try:
+                try:
+                    returncode, out, err = self._run_locked(argv)
+                except SessionError:
+                    if self._closes != closes:
+                        return 143, "", "session was closed"
+
+                    self._close_locked()
+                    returncode, out, err = self._run_locked(argv)
+            except SessionError:
+                self._close_locked()
+                if self._closes != closes:
+                    return 143, "", "session was closed"
+
+                return None
+
+            self._start_idle_timer()
+
+        if self.trace:
+            self._record_trace(argv, started_at, start_time, returncode, out, err)
+
+        return (
+            returncode,
+            out.decode("utf-8", errors="replace"),
+            err.decode("utf-8", errors="replace"),
+        )
+
+    def _record_trace(
+        self,
+        argv: list[str],
+        started_at: float,
+        start_time: float,
+        returncode: int,
+        out: bytes,
+        err: bytes,
+    ):
+        thread = threading.current_thread()
+        tracing.record(
+            tracing.CommandTrace(
+                command=[*self.command, "-c", shlex.join(argv)],
+                action=tracing.get_action(),
+                thread=thread.name,
+                thread_id=thread.ident or 0,
+                started_at=started_at,
+                duration=time.perf_counter() - start_time,
+                returncode=returncode,
+                stdout_bytes=len(out),
+                stderr_bytes=len(err),
+                cancelled=False,
+                timed_out=False,
+            )
+        )
+
+    def close(self):
+        """
+        Closes the shell. A command running in it is cut short rather than
+        waited for, so closing never blocks on one.
+        """
+        self._closes += 1
+
+        if not self._lock.acquire(blocking=False):
+            process = self._process
+            if process is not None and process.poll() is None:
+                process.terminate()
+            return
+
+        try:
+            self._cancel_idle_timer()
+            self._close_locked()
+        finally:
+            self._lock.release()
+
+    def _start(self):
+        try:
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise SessionError(str(e)) from e
+
+        self._write(SESSION_PRELUDE.encode())
+
+    def _run_locked(self, argv: list[str]) -> tuple[int, bytes, bytes]:
+        if not self.alive:
+            self._start()
+
+        marker = f"__boxbuddy_{uuid.uuid4().hex}"
+        self._write(f"__boxbuddy_run {marker} {shlex.join(argv)}\n".encode())
+
+        # anything else the shell or distrobox prints is skipped
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise SessionError("session ended")
+
+            parts = line.decode("utf-8", errors="replace").split()
+            if len(parts) == 4 and parts[0] == marker:
+                break
+
+        try:
+            returncode, out_length, err_length = (int(part) for part in parts[1:])
+        except ValueError as e:
+            raise SessionError(f"bad reply: {line!r}") from e
+
+        out = self._read_exactly(out_length)
+        err = self._read_exactly(err_length)
+
+        return returncode, out, err
+
+    def _write(self, data: bytes):
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise SessionError(str(e)) from e
+
+    def _read_exactly(self, length: int) -> bytes:
+        chunks = []
+        while length > 0:
+            chunk = self._process.stdout.read(length)
+            if not chunk:
+                raise SessionError("session ended")
+
+            chunks.append(chunk)
+            length -= len(chunk)
+
+        return b"".join(chunks)
+
+    def _close_locked(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+        try:
+            process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+
+    def _start_idle_timer(self):
+        self._idle_timer = threading.Timer(self.idle_timeout, self.close)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
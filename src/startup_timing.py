@@ -0,0 +1,21 @@
+import os
+import sys
+import time
+
+# set BOXBUDDY_STARTUP_TIMING=1 to print how long each stage of startup takes
+ENABLED = bool(os.getenv("BOXBUDDY_STARTUP_TIMING"))
+
+_start = time.perf_counter()
+_reached: set[str] = set()
+
+
+def mark(stage: str):
+    """
+    Prints the time since launch the first time a stage is reached
+    """
+    if not ENABLED or stage in _reached:
+        return
+
+    _reached.add(stage)
+    elapsed_ms = (time.perf_counter() - _start) * 1000
+    print(f"startup: {elapsed_ms:8.1f} ms  {stage}", file=sys.stderr)
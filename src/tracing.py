@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+
+# how many finished commands are kept
+TRACE_LIMIT = 500
+
+_traces: deque["CommandTrace"] = deque(maxlen=TRACE_LIMIT)
+_lock = threading.Lock()
+_local = threading.local()
+
+listeners: list[Callable[["CommandTrace"], Any]] = []
+
+
+@dataclass
+class CommandTrace:
+    command: list[str]
+    action: str
+    thread: str
+    thread_id: int
+    started_at: float
+    duration: float
+    returncode: Optional[int]
+    stdout_bytes: int
+    stderr_bytes: int
+    cancelled: bool
+    timed_out: bool
+
+
+def set_action(action: Optional[str]):
+    """
+    Sets the UI action which commands run on this thread are traced under
+    """
+    _local.action = action
+
+
+def get_action(default: Optional[str] = None) -> str:
+    """
+    The action set on this thread, else default, else the thread's name
+    """
+    return getattr(_local, "action", None) or default or threading.current_thread().name
+
+
+@contextmanager
+def traced_action(action: str):
+    """
+    Traces commands created inside the block under action
+    """
+    previous = getattr(_local, "action", None)
+    set_action(action)
+
+    try:
+        yield
+    finally:
+        set_action(previous)
+
+
+def record(trace: CommandTrace):
+    """
+    Adds a finished command to the log. Listeners are called on the
+    command's thread.
+    """
+    with _lock:
+        _traces.append(trace)
+
+    for listener in listeners:
+        listener(trace)
+
+
+def get_traces() -> list[CommandTrace]:
+    with _lock:
+        return list(_traces)
+
+
+def clear_traces():
+    with _lock:
+        _traces.clear()
+
+
+def to_json(traces: list[CommandTrace]) -> dict[str, Any]:
+    return {"traces": [asdict(trace) for trace in traces]}
+
+
+def to_chrome_trace(traces: list[CommandTrace]) -> dict[str, Any]:
+    """
+    Converts traces to the trace event format read by chrome://tracing
+    and Perfetto, with one complete event per command
+    """
+    events = []
+    for trace in traces:
+        events.append(
+            {
+                "name": " ".join(trace.command),
+                "cat": trace.action,
+                "ph": "X",
+                "ts": int(trace.started_at * 1_000_000),
+                "dur": int(trace.duration * 1_000_000),
+                "pid": os.getpid(),
+                "tid": trace.thread_id,
+                "args": {
+                    "action": trace.action,
+                    "returncode": trace.returncode,
+                    "stdout_bytes": trace.stdout_bytes,
+                    "stderr_bytes": trace.stderr_bytes,
+                    "cancelled": trace.cancelled,
+                    "timed_out": trace.timed_out,
+                },
+            }
+        )
+
+    thread_names = {trace.thread_id: trace.thread for trace in traces}
+    for thread_id, thread_name in thread_names.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": {"name": thread_name},
+            }
+        )
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def get_export_name(chrome: bool = False) -> str:
+    """
+    A file name for exporting the current log
+    """
+    suffix = "chrome-trace" if chrome else "trace"
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+
+    return f"boxbuddy-{suffix}-{timestamp}.json"
+
+
+def export_traces(path: str, chrome: bool = False):
+    """
+    Writes the current log to path
+    """
+    traces = get_traces()
+    data = to_chrome_trace(traces) if chrome else to_json(traces)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
@@ -1,32 +1,29 @@
 import os
-import subprocess
+from functools import lru_cache
+from typing import Optional
 
 
-def run_command_and_get_output(command: list[str]) -> tuple[str, str]:
-    if is_flatpak():
-        if command[0] != "flatpak-spawn":
-            from distrobox_handler import FLATPAK_SPAWN_ARR
-
-            command = [*FLATPAK_SPAWN_ARR, *command]
-
-    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    # print("running", command)
-
-    return output.stdout.decode("utf-8"), output.stderr.decode("utf-8")
+def run_command_and_get_output(
+    command: list[str], timeout: Optional[float] = None, bridge: bool = False
+) -> tuple[str, str]:
+    """
+    Runs command to completion on the current thread. From the UI, use
+    command_runner.Command or run_in_background instead. Quick host commands
+    can pass bridge=True to go through the host bridge under flatpak, where
+    they can't be cancelled.
+    """
+    from command_runner import Command
 
+    return Command(command, timeout=timeout, bridge=bridge).run()
 
-def detect_terminal() -> tuple[str, str]:
-    terminal = "gnome-terminal"
-    terminal_exec_arg = "--"
-    err = run_command_and_get_output(["which", "gnome-terminal"])[1]
 
-    if err:
-        terminal = "konsole"
-        terminal_exec_arg = "-e"
+def detect_terminal() -> list[str]:
+    from host_info import get_host_info
 
-    return terminal, terminal_exec_arg
+    return get_host_info().terminal
 
 
+@lru_cache(maxsize=None)
 def is_flatpak() -> bool:
     """
     Detects if running as flatpak
@@ -72,22 +69,36 @@ def get_distro_img(distro: str):
     return f"<span foreground='{colour}'>⬤</span>"
 
 
+def get_warm_img(running: bool):
+    """
+    Gets indicator for whether a box is warm (running) or cold
+    """
+    if running:
+        return "<span foreground='#2ec27e' size='small'>●</span>"
+
+    return "<span foreground='#9a9996' size='small'>○</span>"
+
+
 def has_distrobox_installed() -> bool:
     """
-    Returns whether `which` can find distrobox
+    Returns whether distrobox is on the host's PATH
     """
-    cmd = ["which", "distrobox"]
-    if is_flatpak():
-        cmd = ["flatpak-spawn", "--host", "which", "distrobox"]
+    from host_info import get_host_info, refresh_host_info
 
-    out, err = run_command_and_get_output(cmd)
+    # re-probe if missing, in case it has been installed since
+    return get_host_info().has_distrobox or refresh_host_info().has_distrobox
 
-    # Fedora's behaviour
-    if "no distrobox in" in out or "no distrobox in" in err:
-        return False
 
-    # Debian's behaviour
-    if not out and not err:
-        return False
+def format_size(num_bytes: float) -> str:
+    """
+    Formats a number of bytes for display, e.g. 1.5 GB
+    """
+    if abs(num_bytes) < 1000:
+        return f"{num_bytes:.0f} B"
+
+    for unit in ("kB", "MB", "GB"):
+        num_bytes /= 1000
+        if abs(num_bytes) < 1000:
+            return f"{num_bytes:.1f} {unit}"
 
-    return True
+    return f"{num_bytes / 1000:.1f} TB"
@@ -0,0 +1,128 @@
+import time
+from typing import Optional
+
+from command_runner import run_in_background
+from distrobox_handler import Distrobox, get_box_processes, start_box, stop_box
+from jobs import JobScheduler
+from settings import get_setting, set_setting
+
+# processes distrobox itself keeps running in an otherwise idle box
+IDLE_PROCESSES = ("entrypoint", "distrobox-init", "sleep", "inotifywait", "tail")
+
+
+def is_running(box: Distrobox) -> bool:
+    return box.status.lower().startswith(("up", "running"))
+
+
+def is_warm_box(box_name: str) -> bool:
+    return box_name in get_setting("warm_boxes")
+
+
+def set_warm_box(box_name: str, warm: bool):
+    warm_boxes = [name for name in get_setting("warm_boxes") if name != box_name]
+    if warm:
+        warm_boxes.append(box_name)
+
+    set_setting("warm_boxes", warm_boxes)
+
+
+def is_box_idle(box_name: str) -> Optional[bool]:
+    """
+    Whether nothing but distrobox's own processes run in the box,
+    or None if that can't be told
+    """
+    processes = get_box_processes(box_name)
+    if processes is None:
+        return None
+
+    return all(process in IDLE_PROCESSES for process in processes)
+
+
+class WarmPool:
+    """
+    Keeps favourite boxes started, and stops other boxes once they have
+    been idle for the configured number of minutes
+    """
+
+    def __init__(self, jobs: JobScheduler):
+        self.jobs = jobs
+        self.idle_since: dict[str, float] = {}
+        self.checking_idle = False
+
+    def warm_up(self, boxes: list[Distrobox]):
+        """
+        Starts any favourite box which is stopped
+        """
+        for box in boxes:
+            if is_warm_box(box.name) and not is_running(box):
+                self.jobs.submit(
+                    f"Warm up {box.name}",
+                    start_box,
+                    box.name,
+                    box_name=box.name,
+                    key=f"warm-{box.name}",
+                )
+
+    def mark_active(self, box_name: str):
+        self.idle_since.pop(box_name, None)
+
+    def check_idle(self, boxes: list[Distrobox]):
+        """
+        Checks every running box which isn't a favourite in the background,
+        unless the last check is still running. Only stopping a box goes
+        through the job scheduler, so checks don't flood the jobs panel.
+        """
+        idle_minutes = get_setting("idle_stop_minutes")
+        if not idle_minutes:
+            self.idle_since.clear()
+            return
+
+        if self.checking_idle:
+            return
+
+        box_names = []
+        for box in boxes:
+            if not is_running(box) or is_warm_box(box.name):
+                self.idle_since.pop(box.name, None)
+                continue
+
+            box_names.append(box.name)
+
+        if not box_names:
+            return
+
+        self.checking_idle = True
+        run_in_background(
+            self.find_boxes_to_stop,
+            box_names,
+            idle_minutes * 60,
+            on_done=self.on_idle_checked,
+            on_error=lambda e: self.on_idle_checked([]),
+        )
+
+    def find_boxes_to_stop(self, box_names: list[str], idle_seconds: float):
+        boxes_to_stop = []
+
+        for box_name in box_names:
+            if not is_box_idle(box_name):
+                self.idle_since.pop(box_name, None)
+                continue
+
+            idle_since = self.idle_since.setdefault(box_name, time.monotonic())
+            if time.monotonic() - idle_since >= idle_seconds:
+                self.idle_since.pop(box_name, None)
+                boxes_to_stop.append(box_name)
+
+        return boxes_to_stop
+
+    def on_idle_checked(self, boxes_to_stop: list[str]):
+        self.checking_idle = False
+
+        for box_name in boxes_to_stop:
+            self.jobs.submit(
+                f"Stop idle box {box_name}",
+                stop_box,
+                box_name,
+                box_name=box_name,
+                key=f"idle-stop-{box_name}",
+            )